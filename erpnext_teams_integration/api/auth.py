@@ -1,8 +1,8 @@
 import frappe
-import requests
 from datetime import timedelta
 from frappe.utils import now_datetime, cstr
 from .helpers import get_settings
+from .graph_client import get_client, post_token_request
 import json
 import hashlib
 
@@ -28,8 +28,6 @@ def callback(code=None, state=None, error=None, error_description=None):
             frappe.throw("Teams integration is not properly configured. Please check your settings.")
         
         # Prepare token exchange request
-        token_url = f"https://login.microsoftonline.com/{settings.tenant_id}/oauth2/v2.0/token"
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
         data = {
             "client_id": settings.client_id,
             "client_secret": settings.client_secret,
@@ -40,7 +38,7 @@ def callback(code=None, state=None, error=None, error_description=None):
         }
         
         # Exchange code for tokens
-        response = requests.post(token_url, headers=headers, data=data, timeout=30)
+        response = post_token_request(settings.tenant_id, data)
         
         if response.status_code != 200:
             error_data = response.json() if response.headers.get('content-type', '').startswith('application/json') else response.text
@@ -62,11 +60,7 @@ def callback(code=None, state=None, error=None, error_description=None):
         
         # Get user info and save Azure ID
         try:
-            user_info_response = requests.get(
-                "https://graph.microsoft.com/v1.0/me",
-                headers={"Authorization": f"Bearer {settings.access_token}"},
-                timeout=30
-            )
+            user_info_response = get_client(settings.access_token).get("me")
             
             if user_info_response.status_code == 200:
                 user_info = user_info_response.json()
@@ -127,8 +121,7 @@ def get_authentication_status():
             return {"authenticated": False, "message": "Token expired"}
         
         # Test the token by making a simple API call
-        headers = {"Authorization": f"Bearer {settings.access_token}"}
-        response = requests.get("https://graph.microsoft.com/v1.0/me", headers=headers, timeout=10)
+        response = get_client(settings.access_token).get("me")
         
         if response.status_code == 200:
             return {"authenticated": True, "message": "Authentication successful"}
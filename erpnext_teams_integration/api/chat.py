@@ -1,12 +1,43 @@
 import frappe
 import requests
-from .helpers import get_access_token, get_azure_user_id_by_email, get_login_url
-from frappe.utils import now_datetime, get_datetime, sanitize_html
-from datetime import datetime
+from .helpers import get_access_token, get_login_url, resolve_azure_ids
+from .graph_client import GRAPH_API, get_client, get_default_timeout
+from erpnext_teams_integration.erpnext_teams_integration.doctype.teams_chat_activity.teams_chat_activity import (
+    refresh_chat_activity,
+)
+from frappe.utils import cint, now_datetime, get_datetime, sanitize_html, strip_html_tags
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+import hashlib
 import json
 import html
+import re
 
-GRAPH_API = 'https://graph.microsoft.com/v1.0'
+# Graph returns at most 50 chat messages per page
+MESSAGES_PAGE_SIZE = 50
+
+# Re-read this much before the stored cursor so equal timestamps are never skipped
+CURSOR_OVERLAP = timedelta(seconds=1)
+
+# Chat list traversal for the bulk sync
+CHATS_PAGE_SIZE = 50
+CHAT_LIST_CHECKPOINT_KEY = "teams_chat_sync_checkpoint"
+CHAT_LIST_CHECKPOINT_TTL = 6 * 3600
+
+# Bulk sync fans Graph fetches out over a thread pool; override per site
+# with `teams_sync_concurrency` in site_config.json
+DEFAULT_SYNC_CONCURRENCY = 4
+BULK_SYNC_LOCK_KEY = "teams_bulk_chat_sync"
+BULK_SYNC_LOCK_TIMEOUT = 2 * 3600
+
+# Plaintext preview length; fits the default Data column
+MESSAGE_PREVIEW_LENGTH = 140
+_BLOCK_TAG_RE = re.compile(r'<\s*(br|/p|/div|/li|/h[1-6]|/tr)\b[^>]*>', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Local history pages served to the chat modal
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
 
 # Supported doctypes with their configuration
 SUPPORTED_DOCTYPES = {
@@ -27,9 +58,9 @@ SUPPORTED_DOCTYPES = {
 def get_my_azure_id():
     """Get the current user's Azure ID safely"""
     try:
-        settings = frappe.get_single('Teams Settings')
-        if settings.owner_azure_object_id:
-            return settings.owner_azure_object_id
+        owner_azure_id = frappe.db.get_single_value('Teams Settings', 'owner_azure_object_id')
+        if owner_azure_id:
+            return owner_azure_id
         
         # Try to get from current user
         current_user = frappe.session.user
@@ -62,17 +93,10 @@ def create_group_chat_for_doc(docname, doctype):
         participants_field = config["participants_field"]
         email_field = config["email_field"]
 
-        # Collect Azure Object IDs from participants
-        target_azure_ids = set()
-        participants_data = getattr(doc, participants_field, None)
-        
-        if participants_data:
-            for participant in participants_data:
-                email_val = getattr(participant, email_field, None)
-                if email_val:
-                    azure_id = get_azure_user_id_by_email(email_val)
-                    if azure_id:
-                        target_azure_ids.add(azure_id)
+        # Collect Azure Object IDs from participants in one bulk lookup
+        participants_data = getattr(doc, participants_field, None) or []
+        emails = [getattr(p, email_field, None) for p in participants_data]
+        target_azure_ids = set(resolve_azure_ids([e for e in emails if e]).values())
 
         # Add current user to chat
         my_azure_id = get_my_azure_id()
@@ -98,13 +122,10 @@ def create_group_chat_for_doc(docname, doctype):
 def update_existing_chat(chat_id, target_azure_ids, token):
     """Update existing chat with new members"""
     try:
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        client = get_client(token)
         
         # Get existing members
-        response = requests.get(f"{GRAPH_API}/chats/{chat_id}/members", headers=headers, timeout=30)
+        response = client.get(f"chats/{chat_id}/members")
         
         if response.status_code != 200:
             frappe.log_error(f"Failed to fetch chat members: {response.text}", "Teams API Error")
@@ -119,29 +140,36 @@ def update_existing_chat(chat_id, target_azure_ids, token):
         if not new_member_ids:
             return {"chat_id": chat_id, "message": "Chat is up to date with all participants."}
 
-        # Add new members
+        # Add new members, up to 20 per $batch call
+        sub_requests = [
+            {
+                "id": azure_id,
+                "method": "POST",
+                "url": f"/chats/{chat_id}/members",
+                "body": {
+                    "@odata.type": "#microsoft.graph.aadUserConversationMember",
+                    "roles": ["owner"],
+                    "user@odata.bind": f"{GRAPH_API}/users('{azure_id}')"
+                }
+            }
+            for azure_id in new_member_ids
+        ]
+        results = client.batch(sub_requests)
+        
         added_count = 0
+        failures = []
         for azure_id in new_member_ids:
-            member_payload = {
-                "@odata.type": "#microsoft.graph.aadUserConversationMember",
-                "roles": ["owner"],
-                "user@odata.bind": f"https://graph.microsoft.com/v1.0/users('{azure_id}')"
-            }
-            
-            add_response = requests.post(
-                f"{GRAPH_API}/chats/{chat_id}/members",
-                headers=headers,
-                json=member_payload,
-                timeout=30
-            )
-            
-            if add_response.status_code in (200, 201):
+            result = results.get(azure_id) or {}
+            if result.get("status") in (200, 201):
                 added_count += 1
             else:
-                frappe.log_error(
-                    f"Failed to add member {azure_id} to chat {chat_id}: {add_response.text}",
-                    "Teams Add Member Error"
-                )
+                failures.append(f"{azure_id}: {result.get('status')} {json.dumps(result.get('body'), default=str)}")
+        
+        if failures:
+            frappe.log_error(
+                f"Failed to add {len(failures)} member(s) to chat {chat_id}:\n" + "\n".join(failures),
+                "Teams Add Member Error"
+            )
 
         return {
             "chat_id": chat_id, 
@@ -170,12 +198,7 @@ def create_new_chat(docname, doctype, target_azure_ids, token):
             'members': members
         }
 
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
-
-        response = requests.post(f"{GRAPH_API}/chats", headers=headers, json=payload, timeout=30)
+        response = get_client(token).post("chats", json=payload)
         
         if response.status_code not in (200, 201):
             frappe.log_error(f"Failed to create chat: {response.text}", "Teams Create Chat Error")
@@ -224,10 +247,7 @@ def send_message_to_chat(chat_id, message, docname=None, doctype=None):
         # Sanitize message content
         sanitized_message = html.escape(str(message))
         
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        client = get_client(token)
         
         payload = {
             'body': {
@@ -236,12 +256,7 @@ def send_message_to_chat(chat_id, message, docname=None, doctype=None):
             }
         }
         
-        response = requests.post(
-            f"{GRAPH_API}/chats/{chat_id}/messages", 
-            headers=headers, 
-            json=payload,
-            timeout=30
-        )
+        response = client.post(f"chats/{chat_id}/messages", json=payload)
         
         if response.status_code in (200, 201):
             message_data = response.json()
@@ -252,31 +267,6 @@ def send_message_to_chat(chat_id, message, docname=None, doctype=None):
                 "message": "Message sent successfully"
             }
         
-        elif response.status_code == 401:
-            # Try token refresh
-            try:
-                from .helpers import refresh_access_token
-                token = refresh_access_token()
-                headers['Authorization'] = f'Bearer {token}'
-                
-                response = requests.post(
-                    f"{GRAPH_API}/chats/{chat_id}/messages", 
-                    headers=headers, 
-                    json=payload,
-                    timeout=30
-                )
-                
-                if response.status_code in (200, 201):
-                    message_data = response.json()
-                    _save_message_local(message_data, chat_id, docname, doctype, 'Outbound')
-                    return {
-                        "success": True,
-                        "message_id": message_data.get("id"),
-                        "message": "Message sent successfully after token refresh"
-                    }
-            except Exception as refresh_error:
-                frappe.log_error(f"Token refresh failed: {str(refresh_error)}", "Teams Token Refresh Error")
-        
         # Log the error and return failure
         frappe.log_error(f"Failed to send message: {response.status_code} - {response.text}", "Teams Send Message Error")
         frappe.throw(f"Failed to send message to Teams: {response.status_code}")
@@ -291,44 +281,102 @@ def send_message_to_chat(chat_id, message, docname=None, doctype=None):
 
 @frappe.whitelist()
 def get_local_chat_messages(chat_id, limit=200):
-    """Get chat messages from local database with pagination"""
+    """Get the most recent chat messages from local database, oldest first"""
     if not chat_id:
         return []
     
+    return get_chat_history(chat_id, limit=limit).get("messages", [])
+
+
+@frappe.whitelist()
+def get_chat_history(chat_id, before=None, after=None, limit=HISTORY_PAGE_SIZE):
+    """
+    One page of a chat's stored messages, oldest first.
+    
+    Pages are keyed on (created_at, name) and served from the
+    (chat_id, created_at) index, so reading far back costs the same as
+    reading the latest page. Pass the `before` cursor of a page to get the
+    next older one, or its `after` cursor to get messages added since.
+    Without either the latest page is returned. `has_more` tells whether
+    another page exists in the requested direction.
+    
+    Bodies are sanitized when they are stored and returned as-is.
+    """
+    empty = {"messages": [], "before": None, "after": None, "has_more": False}
+    if not chat_id:
+        return empty
+    
     try:
-        limit = min(int(limit), 500)  # Cap at 500 messages
-        
+        limit = min(max(cint(limit), 1), HISTORY_MAX_PAGE_SIZE)
+        filters = [['chat_id', '=', chat_id], ['is_deleted', '=', 0]]
+        or_filters = None
+        descending = True
+        
+        cursor = _parse_history_cursor(after or before)
+        if cursor:
+            # (created_at, name) beyond the cursor, written as an AND of a
+            # range on created_at and an OR that breaks ties on name
+            op = '>' if after else '<'
+            descending = not after
+            filters.append(['created_at', op + '=', cursor[0]])
+            or_filters = [['created_at', op, cursor[0]], ['name', op, cursor[1]]]
+        
+        direction = 'desc' if descending else 'asc'
         messages = frappe.get_all(
-            'Teams Chat Message', 
-            filters={'chat_id': chat_id}, 
+            'Teams Chat Message',
+            filters=filters,
+            or_filters=or_filters,
             fields=[
-                'message_id', 'sender_display', 'body', 'created_at', 
+                'name', 'message_id', 'sender_display', 'body', 'created_at',
                 'direction', 'sender_id'
-            ], 
-            order_by='created_at desc', 
-            limit_page_length=limit
+            ],
+            order_by=f'created_at {direction}, name {direction}',
+            limit_page_length=limit + 1
         )
         
-        # Convert datetime objects to strings for JSON serialization
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if descending:
+            messages.reverse()
+        
         for msg in messages:
             if msg.get('created_at'):
                 msg['created_at'] = str(msg['created_at'])
-            
-            # Sanitize message body for display
-            if msg.get('body'):
-                msg['body'] = sanitize_html(msg['body'])
         
-        # Reverse to show oldest first
-        return list(reversed(messages))
+        return {
+            "messages": messages,
+            "before": _history_cursor(messages[0]) if messages else None,
+            "after": _history_cursor(messages[-1]) if messages else None,
+            "has_more": has_more
+        }
         
     except Exception as e:
         frappe.log_error(f"Error fetching local messages for chat {chat_id}: {str(e)}", "Teams Local Messages Error")
-        return []
+        return empty
+
+
+def _history_cursor(message):
+    return f"{message['created_at']}|{message['name']}"
+
+
+def _parse_history_cursor(cursor):
+    """Split a `created_at|name` cursor; returns None if it is malformed"""
+    if not cursor or '|' not in cursor:
+        return None
+    created_at, name = cursor.rsplit('|', 1)
+    try:
+        created_at = get_datetime(created_at)
+    except Exception:
+        return None
+    # get_datetime maps an empty string to None rather than raising
+    if not created_at or not name:
+        return None
+    return created_at, name
 
 
 @frappe.whitelist()
 def fetch_and_store_chat_messages(chat_id, docname=None, doctype=None, top=50):
-    """Fetch messages from Teams API and store locally"""
+    """Fetch messages changed since the last sync from Teams API and store locally"""
     if not chat_id:
         return None
     
@@ -337,148 +385,298 @@ def fetch_and_store_chat_messages(chat_id, docname=None, doctype=None, top=50):
         if not token:
             return None
         
-        top = min(int(top), 100)  # Cap at 100 messages per request
-        headers = {'Authorization': f'Bearer {token}'}
+        top = min(int(top), MESSAGES_PAGE_SIZE)
+        conversation = _get_conversation(chat_id)
         
-        response = requests.get(
-            f"{GRAPH_API}/chats/{chat_id}/messages?$top={top}",
-            headers=headers,
-            timeout=30
-        )
+        result = _fetch_chat_messages(get_client(token), chat_id, conversation.get("messages_cursor"), top)
+        rows_affected = _store_fetched_messages(chat_id, result, conversation, docname, doctype)
         
-        if response.status_code == 200:
-            messages = response.json().get('value', [])
-            stored_count = 0
-            
-            for message in messages:
-                if _save_message_local(message, chat_id, docname, doctype, 'Inbound'):
-                    stored_count += 1
-            
-            return {
-                "success": True,
-                "fetched": len(messages),
-                "stored": stored_count
-            }
-            
-        elif response.status_code == 401:
-            # Try token refresh
-            try:
-                from .helpers import refresh_access_token
-                token = refresh_access_token()
-                headers['Authorization'] = f'Bearer {token}'
-                
-                response = requests.get(
-                    f"{GRAPH_API}/chats/{chat_id}/messages?$top={top}",
-                    headers=headers,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    messages = response.json().get('value', [])
-                    stored_count = 0
-                    
-                    for message in messages:
-                        if _save_message_local(message, chat_id, docname, doctype, 'Inbound'):
-                            stored_count += 1
-                    
-                    return {
-                        "success": True,
-                        "fetched": len(messages),
-                        "stored": stored_count
-                    }
-            except Exception as refresh_error:
-                frappe.log_error(f"Token refresh failed during message fetch: {str(refresh_error)}", "Teams Fetch Error")
-        
-        frappe.log_error(f"Failed to fetch messages: {response.status_code} - {response.text}", "Teams Fetch Messages Error")
-        return None
+        return {
+            "success": True,
+            "fetched": len(result["messages"]),
+            "rows_affected": rows_affected
+        }
         
     except Exception as e:
         frappe.log_error(f"Error fetching messages for chat {chat_id}: {str(e)}", "Teams Fetch Messages Error")
         return None
 
 
+def _get_conversation(chat_id):
+    """Linked document and sync cursor for a chat, or an empty dict"""
+    return frappe.db.get_value(
+        "Teams Conversation",
+        {"chat_id": chat_id},
+        ["name", "document_type", "document_name", "messages_cursor"],
+        as_dict=True
+    ) or frappe._dict()
+
+
+def _parse_graph_datetime(value):
+    """Parse a Graph ISO 8601 timestamp into an aware UTC datetime"""
+    if not value:
+        return None
+    try:
+        if value.endswith('Z'):
+            value = value[:-1] + '+00:00'
+        # fromisoformat only accepts 3 or 6 fractional digits before Python 3.11
+        if '.' in value:
+            head, tail = value.split('.', 1)
+            digits = ''.join(c for c in tail if c.isdigit())
+            value = f"{head}.{digits[:6].ljust(6, '0')}{tail[len(digits):]}"
+        dt = datetime.fromisoformat(value)
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    except (ValueError, AttributeError):
+        return None
+
+
+def _format_graph_datetime(dt):
+    return dt.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.') + f"{dt.microsecond // 1000:03d}Z"
+
+
+def _fetch_chat_messages(client, chat_id, cursor=None, page_size=MESSAGES_PAGE_SIZE):
+    """
+    Fetch every message in a chat modified after `cursor`, following all
+    @odata.nextLink pages. Without a cursor the full history is read.
+    
+    Returns {"messages": [...], "cursor": newest lastModifiedDateTime seen}.
+    Raises if any page fails, so the stored cursor is never advanced past a gap.
+    """
+    params = {"$top": page_size}
+    since = _parse_graph_datetime(cursor)
+    if since:
+        params["$orderby"] = "lastModifiedDateTime desc"
+        params["$filter"] = f"lastModifiedDateTime gt {_format_graph_datetime(since - CURSOR_OVERLAP)}"
+    
+    messages = []
+    newest, newest_raw = since, cursor
+    url = f"chats/{chat_id}/messages"
+    
+    while url:
+        response = client.get(url, params=params)
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch messages for chat {chat_id}: {response.status_code} - {response.text}")
+        
+        data = response.json()
+        for message in data.get('value', []):
+            messages.append(message)
+            raw = message.get('lastModifiedDateTime') or message.get('createdDateTime')
+            modified = _parse_graph_datetime(raw)
+            if modified and (newest is None or modified > newest):
+                newest, newest_raw = modified, raw
+        
+        # nextLink already carries the query string
+        url = data.get('@odata.nextLink')
+        params = None
+    
+    return {"messages": messages, "cursor": newest_raw}
+
+
+def _store_fetched_messages(chat_id, result, conversation=None, docname=None, doctype=None):
+    """Persist a fetch result and advance the chat's sync cursor"""
+    conversation = conversation or frappe._dict()
+    docname = docname or conversation.get("document_name")
+    doctype = doctype or conversation.get("document_type")
+    
+    rows_affected = _save_messages_local(result["messages"], chat_id, docname, doctype, 'Inbound', commit=False)
+    
+    if conversation.get("name"):
+        frappe.db.set_value("Teams Conversation", conversation.name, {
+            "messages_cursor": result["cursor"],
+            "last_synced": now_datetime()
+        })
+    
+    # Messages and cursor land in the same transaction
+    frappe.db.commit()
+    
+    return rows_affected
+
+
 def _save_message_local(msg_json, chat_id, docname=None, doctype=None, direction='Inbound'):
-    """Save Teams message to local database with better error handling"""
+    """Save a single Teams message to the local database"""
     try:
-        if not msg_json or not isinstance(msg_json, dict):
-            return False
-        
-        message_id = msg_json.get('id')
-        if not message_id:
-            return False
-        
-        # Check if message already exists
-        if frappe.db.exists('Teams Chat Message', {'message_id': message_id}):
-            return False  # Already stored
-        
-        # Extract message content
-        body_data = msg_json.get('body', {})
-        body_content = ""
-        
-        if isinstance(body_data, dict):
-            body_content = body_data.get('content', '')
-        elif isinstance(body_data, str):
-            body_content = body_data
-        
-        # Parse created timestamp
-        created_str = msg_json.get('createdDateTime')
-        created_at = now_datetime()
-        
-        if created_str:
-            try:
-                # Handle ISO format with timezone
-                if created_str.endswith('Z'):
-                    created_str = created_str[:-1] + '+00:00'
-                
-                created_dt = datetime.fromisoformat(created_str)
-                created_at = created_dt.strftime('%Y-%m-%d %H:%M:%S')
-            except (ValueError, AttributeError):
-                # Use current time if parsing fails
-                created_at = now_datetime().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Extract sender information
-        sender_info = msg_json.get('from', {})
-        sender_id = None
-        sender_display = "Unknown"
-        
-        if isinstance(sender_info, dict):
-            user_info = sender_info.get('user', {})
-            if user_info:
-                sender_id = user_info.get('id')
-                sender_display = user_info.get('displayName', 'Unknown')
-            else:
-                sender_id = sender_info.get('id')
-                sender_display = sender_info.get('displayName', 'Unknown')
-        
-        # Build document payload
-        doc_data = {
-            'doctype': 'Teams Chat Message',
-            'chat_id': chat_id,
-            'message_id': message_id,
-            'sender_id': sender_id,
-            'sender_display': sender_display,
-            'body': sanitize_html(body_content) if body_content else "",
-            'created_at': created_at,
-            'direction': direction
-        }
-        
-        # Link to document if provided
-        if doctype and docname:
-            doc_data['document_type'] = doctype
-            doc_data['document_name'] = docname
-        
-        # Create and save document
-        message_doc = frappe.get_doc(doc_data)
-        message_doc.insert(ignore_permissions=True)
-        frappe.db.commit()
-        
-        return True
-        
+        return _save_messages_local([msg_json], chat_id, docname, doctype, direction) > 0
     except Exception as e:
+        message_id = msg_json.get('id') if isinstance(msg_json, dict) else None
         frappe.log_error(f"Error saving Teams message {message_id}: {str(e)}", "Teams Message Save Error")
         return False
 
 
+# Columns written by the bulk insert path, in insert order
+MESSAGE_INSERT_FIELDS = (
+    'name', 'creation', 'modified', 'owner', 'modified_by',
+    'chat_id', 'message_id', 'sender_id', 'sender_display', 'body', 'body_text', 'preview',
+    'created_at', 'last_modified_at', 'is_deleted', 'deleted_at', 'content_hash',
+    'direction', 'document_type', 'document_name'
+)
+
+# Columns refreshed when an already stored message comes back edited or
+# deleted. Direction, links and created_at belong to the first write.
+MESSAGE_UPDATE_FIELDS = (
+    'sender_id', 'sender_display', 'body', 'body_text', 'preview', 'last_modified_at',
+    'is_deleted', 'deleted_at', 'modified', 'modified_by'
+)
+
+
+# Rows per INSERT statement
+MESSAGE_INSERT_CHUNK = 500
+
+
+def _save_messages_local(messages, chat_id, docname=None, doctype=None, direction='Inbound', commit=True):
+    """
+    Upsert a page of Graph messages with a multi-row INSERT ... ON DUPLICATE KEY UPDATE.
+    
+    New message_ids are inserted. For existing ones the stored content_hash
+    decides: an edit or deletion rewrites the row, a message that only came
+    back because of e.g. a reaction is left untouched. There is no lookup
+    before the write, so concurrent syncs cannot race each other.
+    
+    Returns MariaDB's affected-row count for the upsert: 1 per inserted
+    message, 2 per changed one, 0 for unchanged ones. It is reported as
+    `rows_affected` rather than a message count; 0 means the page changed
+    nothing. Errors propagate so that sync callers never advance their
+    cursor past messages that were not saved.
+    """
+    rows = {}
+    for msg_json in messages or []:
+        row = _build_message_row(msg_json, chat_id, docname, doctype, direction)
+        if row and row['message_id'] not in rows:
+            rows[row['message_id']] = row
+    
+    if not rows:
+        return 0
+    
+    now = now_datetime()
+    user = frappe.session.user
+    values = []
+    for row in rows.values():
+        row.update({
+            'name': frappe.generate_hash(length=10),
+            'creation': now,
+            'modified': now,
+            'owner': user,
+            'modified_by': user
+        })
+        values.append(tuple(row.get(field) for field in MESSAGE_INSERT_FIELDS))
+    
+    columns = ", ".join(f"`{field}`" for field in MESSAGE_INSERT_FIELDS)
+    row_placeholder = "(" + ", ".join(["%s"] * len(MESSAGE_INSERT_FIELDS)) + ")"
+    
+    # Assignments run left to right and see earlier ones, so content_hash
+    # must be compared by every column before it is overwritten itself
+    updates = ", ".join(
+        f"`{field}` = IF(`content_hash` <=> VALUES(`content_hash`), `{field}`, VALUES(`{field}`))"
+        for field in MESSAGE_UPDATE_FIELDS
+    )
+    updates += ", `content_hash` = VALUES(`content_hash`)"
+    
+    rows_affected = 0
+    for start in range(0, len(values), MESSAGE_INSERT_CHUNK):
+        chunk = values[start:start + MESSAGE_INSERT_CHUNK]
+        frappe.db.sql(
+            f"""INSERT INTO `tabTeams Chat Message` ({columns})
+            VALUES {', '.join([row_placeholder] * len(chunk))}
+            ON DUPLICATE KEY UPDATE {updates}""",
+            [value for row in chunk for value in row]
+        )
+        rows_affected += frappe.db._cursor.rowcount
+    
+    if rows_affected:
+        refresh_chat_activity({(chat_id, row['created_at'][:10]) for row in rows.values()})
+    
+    if commit:
+        frappe.db.commit()
+    
+    return rows_affected
+
+
+def _build_message_row(msg_json, chat_id, docname=None, doctype=None, direction='Inbound'):
+    """Map a Graph chatMessage to Teams Chat Message column values"""
+    if not msg_json or not isinstance(msg_json, dict):
+        return None
+    
+    message_id = msg_json.get('id')
+    if not message_id:
+        return None
+    
+    # Extract message content
+    body_data = msg_json.get('body', {})
+    body_content = ""
+    
+    if isinstance(body_data, dict):
+        body_content = body_data.get('content', '')
+    elif isinstance(body_data, str):
+        body_content = body_data
+    
+    # Parse timestamps; Graph sets deletedDateTime on soft-deleted messages
+    created_dt = _parse_graph_datetime(msg_json.get('createdDateTime'))
+    created_at = (created_dt or now_datetime()).strftime('%Y-%m-%d %H:%M:%S')
+    modified_dt = _parse_graph_datetime(msg_json.get('lastModifiedDateTime'))
+    deleted_dt = _parse_graph_datetime(msg_json.get('deletedDateTime'))
+    
+    # Extract sender information
+    sender_info = msg_json.get('from', {})
+    sender_id = None
+    sender_display = "Unknown"
+    
+    if isinstance(sender_info, dict):
+        user_info = sender_info.get('user', {})
+        if user_info:
+            sender_id = user_info.get('id')
+            sender_display = user_info.get('displayName', 'Unknown')
+        else:
+            sender_id = sender_info.get('id')
+            sender_display = sender_info.get('displayName', 'Unknown')
+    
+    row = {
+        'chat_id': chat_id,
+        'message_id': message_id,
+        'sender_id': sender_id,
+        'sender_display': sender_display,
+        'body': sanitize_html(body_content) if body_content else "",
+        'created_at': created_at,
+        'last_modified_at': modified_dt.strftime('%Y-%m-%d %H:%M:%S') if modified_dt else None,
+        'is_deleted': 1 if deleted_dt else 0,
+        'deleted_at': deleted_dt.strftime('%Y-%m-%d %H:%M:%S') if deleted_dt else None,
+        'direction': direction,
+        'document_type': None,
+        'document_name': None
+    }
+    row['body_text'] = _message_plaintext(row['body'])
+    row['preview'] = _message_preview(row['body_text'])
+    row['content_hash'] = _message_content_hash(row)
+    
+    # Link to document if provided
+    if doctype and docname:
+        row['document_type'] = doctype
+        row['document_name'] = docname
+    
+    return row
+
+
+def _message_plaintext(body):
+    """Plaintext of a stored HTML body, for search and previews"""
+    if not body:
+        return ""
+    text = strip_html_tags(_BLOCK_TAG_RE.sub(' ', body))
+    return _WHITESPACE_RE.sub(' ', html.unescape(text)).strip()
+
+
+def _message_preview(body_text):
+    if len(body_text) <= MESSAGE_PREVIEW_LENGTH:
+        return body_text
+    return body_text[:MESSAGE_PREVIEW_LENGTH - 1].rstrip() + "…"
+
+
+def _message_content_hash(row):
+    """Hash of the fields an edit or deletion can change"""
+    content = json.dumps(
+        [row['sender_id'], row['sender_display'], row['body'], row['is_deleted'], row['deleted_at']],
+        default=str
+    )
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
 @frappe.whitelist()
 def post_message_to_channel(team_id, channel_id, message, docname=None):
     """Post message to Teams channel"""
@@ -490,10 +688,7 @@ def post_message_to_channel(team_id, channel_id, message, docname=None):
         if not token:
             return {'error': 'auth_required', 'message': 'Authentication required'}
         
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        client = get_client(token)
         
         payload = {
             'body': {
@@ -502,39 +697,13 @@ def post_message_to_channel(team_id, channel_id, message, docname=None):
             }
         }
         
-        response = requests.post(
-            f"{GRAPH_API}/teams/{team_id}/channels/{channel_id}/messages",
-            headers=headers,
-            json=payload,
-            timeout=30
-        )
+        response = client.post(f"teams/{team_id}/channels/{channel_id}/messages", json=payload)
         
         if response.status_code in (200, 201):
             return {
                 "success": True,
                 "message": "Posted to channel successfully"
             }
-        elif response.status_code == 401:
-            # Try token refresh
-            try:
-                from .helpers import refresh_access_token
-                token = refresh_access_token()
-                headers['Authorization'] = f'Bearer {token}'
-                
-                response = requests.post(
-                    f"{GRAPH_API}/teams/{team_id}/channels/{channel_id}/messages",
-                    headers=headers,
-                    json=payload,
-                    timeout=30
-                )
-                
-                if response.status_code in (200, 201):
-                    return {
-                        "success": True,
-                        "message": "Posted to channel successfully after token refresh"
-                    }
-            except Exception as refresh_error:
-                frappe.log_error(f"Token refresh failed during channel post: {str(refresh_error)}", "Teams Channel Post Error")
         
         frappe.log_error(f"Failed to post to channel: {response.status_code} - {response.text}", "Teams Channel Post Error")
         frappe.throw(f"Failed to post to Teams channel: {response.status_code}")
@@ -552,45 +721,38 @@ def sync_all_conversations(chat_id=None):
         if not access_token:
             frappe.throw("Could not fetch Teams access token. Please authenticate first.")
 
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
+        client = get_client(access_token)
 
         synced_count = 0
         error_count = 0
 
         if chat_id:
             # Sync specific chat
-            result = _sync_single_chat(chat_id, headers)
+            result = _sync_single_chat(chat_id, client)
             if result:
                 synced_count = 1
             else:
                 error_count = 1
         else:
-            # Sync all chats
+            # Sync every chat linked to a document, page by page
+            cache = frappe.cache()
+            lock = cache.lock(cache.make_key(BULK_SYNC_LOCK_KEY), timeout=BULK_SYNC_LOCK_TIMEOUT)
+            if not lock.acquire(blocking=False):
+                frappe.msgprint("A Teams conversation sync is already running.")
+                return {"success": False, "synced": 0, "errors": 0, "message": "Sync already running"}
+            
             try:
-                # Get all chats from Teams
-                chats_response = requests.get(f"{GRAPH_API}/chats", headers=headers, timeout=30)
-                
-                if chats_response.status_code == 200:
-                    chats_data = chats_response.json()
-                    chat_list = chats_data.get("value", [])
-                    
-                    for chat in chat_list:
-                        chat_id = chat.get("id")
-                        if chat_id:
-                            if _sync_single_chat(chat_id, headers):
-                                synced_count += 1
-                            else:
-                                error_count += 1
-                else:
-                    frappe.log_error(f"Failed to fetch chats list: {chats_response.status_code} - {chats_response.text}", "Teams Sync Error")
-                    frappe.throw("Failed to fetch chats list from Teams")
+                synced_count, error_count = _sync_conversations_parallel(_iter_linked_conversations(client))
                     
             except Exception as e:
                 frappe.log_error(f"Error during bulk sync: {str(e)}", "Teams Bulk Sync Error")
                 frappe.throw("Failed to sync conversations")
+            
+            finally:
+                try:
+                    lock.release()
+                except Exception:
+                    pass
 
         # Update conversation records
         frappe.msgprint(f"Synced {synced_count} conversation(s) successfully. {error_count} errors occurred.")
@@ -606,28 +768,106 @@ def sync_all_conversations(chat_id=None):
         frappe.throw("Failed to sync Teams conversations. Check error logs for details.")
 
 
-def _sync_single_chat(chat_id, headers):
-    """Sync a single chat's messages"""
-    try:
-        messages_url = f"{GRAPH_API}/chats/{chat_id}/messages?$top=50"
-        messages_response = requests.get(messages_url, headers=headers, timeout=30)
+def _iter_linked_conversations(client):
+    """
+    Stream the Teams Conversation rows of chats the account can see.
+    
+    Follows every @odata.nextLink of GET /chats and filters each page with a
+    single IN query. The page being processed is checkpointed in Redis, so a
+    run that dies half-way resumes from that page on the next run.
+    """
+    cache = frappe.cache()
+    first_page = f"chats?$top={CHATS_PAGE_SIZE}"
+    url = cache.get_value(CHAT_LIST_CHECKPOINT_KEY) or first_page
+    resumed = url != first_page
+    
+    while url:
+        cache.set_value(CHAT_LIST_CHECKPOINT_KEY, url, expires_in_sec=CHAT_LIST_CHECKPOINT_TTL)
+        response = client.get(url)
         
-        if messages_response.status_code == 200:
-            messages = messages_response.json().get("value", [])
-            stored_count = 0
-            
-            for msg in messages:
-                if _save_message_local(msg, chat_id, None, None, "Inbound"):
-                    stored_count += 1
+        if response.status_code != 200:
+            if resumed:
+                # Checkpointed skip tokens can expire; start over from the first page
+                cache.delete_value(CHAT_LIST_CHECKPOINT_KEY)
+                url, resumed = first_page, False
+                continue
+            raise Exception(f"Failed to fetch chats list: {response.status_code} - {response.text}")
+        
+        data = response.json()
+        page_ids = [chat.get("id") for chat in data.get("value", []) if chat.get("id")]
+        
+        if page_ids:
+            linked = {
+                row.chat_id: row
+                for row in frappe.get_all(
+                    "Teams Conversation",
+                    filters={"chat_id": ["in", page_ids]},
+                    fields=["name", "chat_id", "document_type", "document_name", "messages_cursor"]
+                )
+            }
+            for chat_id in page_ids:
+                if chat_id in linked:
+                    yield linked[chat_id]
+        
+        url = data.get("@odata.nextLink")
+        resumed = False
+    
+    cache.delete_value(CHAT_LIST_CHECKPOINT_KEY)
+
+
+def _sync_conversations_parallel(conversations):
+    """
+    Fetch chats concurrently and store the results from this thread.
+    
+    Worker threads only talk to Graph: frappe.local and the DB connection
+    belong to this thread, which stays the single writer. At most twice the
+    pool size is kept in flight so memory stays bounded. Returns
+    (synced, errors).
+    """
+    max_workers = max(1, cint(frappe.conf.get("teams_sync_concurrency") or DEFAULT_SYNC_CONCURRENCY))
+    # frappe.conf is not available in the pool threads; resolve it here
+    timeout = get_default_timeout()
+    in_flight = {}
+    totals = [0, 0]
+    
+    def drain(return_when):
+        done, _ = wait(list(in_flight), return_when=return_when)
+        for future in done:
+            conversation = in_flight.pop(future)
+            try:
+                _store_fetched_messages(conversation.chat_id, future.result(), conversation)
+                totals[0] += 1
+            except Exception as e:
+                frappe.log_error(f"Error syncing single chat {conversation.chat_id}: {str(e)}", "Teams Single Chat Sync Error")
+                totals[1] += 1
+    
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="teams-sync") as executor:
+        for conversation in conversations:
+            token = get_access_token()
+            if not token:
+                raise Exception("Access token unavailable during bulk sync")
             
-            # Update conversation last synced time
-            if frappe.db.exists("Teams Conversation", {"chat_id": chat_id}):
-                frappe.db.set_value("Teams Conversation", {"chat_id": chat_id}, "last_synced", now_datetime())
+            # Token refresh needs frappe, so workers must not retry 401s themselves
+            client = get_client(token, timeout=timeout, retry_on_401=False)
+            future = executor.submit(_fetch_chat_messages, client, conversation.chat_id, conversation.messages_cursor)
+            in_flight[future] = conversation
             
-            return True
-        else:
-            frappe.log_error(f"Failed to sync chat {chat_id}: {messages_response.status_code} - {messages_response.text}", "Teams Single Chat Sync Error")
-            return False
+            if len(in_flight) >= max_workers * 2:
+                drain(FIRST_COMPLETED)
+        
+        while in_flight:
+            drain(FIRST_COMPLETED)
+    
+    return totals[0], totals[1]
+
+
+def _sync_single_chat(chat_id, client):
+    """Sync a single chat's messages changed since its stored cursor"""
+    try:
+        conversation = _get_conversation(chat_id)
+        result = _fetch_chat_messages(client, chat_id, conversation.get("messages_cursor"))
+        _store_fetched_messages(chat_id, result, conversation)
+        return True
             
     except Exception as e:
         frappe.log_error(f"Error syncing single chat {chat_id}: {str(e)}", "Teams Single Chat Sync Error")
@@ -636,21 +876,26 @@ def _sync_single_chat(chat_id, headers):
 
 @frappe.whitelist()
 def get_chat_statistics(chat_id=None):
-    """Get statistics about Teams chat messages"""
+    """Get statistics about Teams chat messages from the activity rollup"""
     try:
-        filters = {}
-        if chat_id:
-            filters['chat_id'] = chat_id
+        condition = "WHERE chat_id = %(chat_id)s" if chat_id else ""
+        totals = frappe.db.sql(f"""
+            SELECT direction, SUM(message_count) AS message_count
+            FROM `tabTeams Chat Activity`
+            {condition}
+            GROUP BY direction
+        """, {"chat_id": chat_id}, as_dict=True)
+        by_direction = {row.direction: int(row.message_count or 0) for row in totals}
         
         stats = {
-            "total_messages": frappe.db.count("Teams Chat Message", filters),
-            "inbound_messages": frappe.db.count("Teams Chat Message", {**filters, "direction": "Inbound"}),
-            "outbound_messages": frappe.db.count("Teams Chat Message", {**filters, "direction": "Outbound"}),
-            "unique_chats": frappe.db.sql("""
-                SELECT COUNT(DISTINCT chat_id) 
-                FROM `tabTeams Chat Message` 
-                WHERE {}
-            """.format("1=1" if not chat_id else "chat_id = %(chat_id)s"), {"chat_id": chat_id})[0][0]
+            "total_messages": sum(by_direction.values()),
+            "inbound_messages": by_direction.get("Inbound", 0),
+            "outbound_messages": by_direction.get("Outbound", 0),
+            "unique_chats": frappe.db.sql(f"""
+                SELECT COUNT(DISTINCT chat_id)
+                FROM `tabTeams Chat Activity`
+                {condition}
+            """, {"chat_id": chat_id})[0][0]
         }
         
         return stats
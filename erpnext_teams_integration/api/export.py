@@ -0,0 +1,359 @@
+import csv
+import gzip
+import hashlib
+import json
+import os
+
+import frappe
+from frappe import _
+from frappe.utils import add_to_date, cint, get_datetime, now_datetime
+
+# pyarrow is an optional dependency (`pip install erpnext_teams_integration[analytics]`)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Rows read per keyset page; memory use is bounded by this, not the history size
+EXPORT_PAGE_SIZE = 2000
+
+# Columns written to exports, in order
+EXPORT_FIELDS = (
+    "name", "chat_id", "message_id", "sender_id", "sender_display", "body", "body_text",
+    "created_at", "last_modified_at", "is_deleted", "deleted_at", "direction",
+    "document_type", "document_name"
+)
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_COMPLETE_EVENT = "teams_chat_export_complete"
+
+# Parquet analytics export; the target directory can be overridden per site
+# with `teams_parquet_export_dir` in site_config.json
+PARQUET_PAGE_SIZE = 50000
+PARQUET_DEFAULT_DIR = ("private", "teams_analytics")
+PARQUET_MESSAGE_FIELDS = (*EXPORT_FIELDS, "modified")
+CONVERSATION_EXPORT_FIELDS = (
+    "name", "chat_id", "topic", "document_type", "document_name", "last_synced", "modified"
+)
+PARQUET_EXPORT_JOB_ID = "teams_parquet_export"
+
+# `modified` is set before the sync transaction commits, which can be several
+# minutes for a large chat. Rows newer than this are left for the next run so
+# a late commit never lands below the watermark; override per site with
+# `teams_parquet_export_lag_minutes` in site_config.json
+DEFAULT_PARQUET_EXPORT_LAG_MINUTES = 60
+
+
+def iter_message_pages(chat_id=None, page_size=EXPORT_PAGE_SIZE, fields=EXPORT_FIELDS):
+    """
+    Yield Teams Chat Message rows in (created_at, name) order, one page at a time.
+
+    Each page continues from the last key of the previous one, so every
+    read is an index range scan regardless of how far into the history it is.
+    """
+    columns = ", ".join(f"`{field}`" for field in fields)
+    chat_condition = "chat_id = %(chat_id)s AND " if chat_id else ""
+    values = {"chat_id": chat_id, "limit": page_size}
+    cursor = None
+
+    while True:
+        if cursor:
+            values.update(created_at=cursor[0], name=cursor[1])
+            keyset = "(created_at > %(created_at)s OR (created_at = %(created_at)s AND name > %(name)s))"
+        else:
+            keyset = "1=1"
+
+        rows = frappe.db.sql(
+            f"""
+            SELECT {columns} FROM `tabTeams Chat Message`
+            WHERE {chat_condition}{keyset}
+            ORDER BY created_at, name
+            LIMIT %(limit)s
+            """,
+            values,
+            as_dict=True
+        )
+        if not rows:
+            return
+
+        yield rows
+
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1].created_at, rows[-1].name)
+
+
+def run_chat_export(chat_id=None, format="ndjson", user=None):
+    """
+    Background job: stream chat history into a gzip file under private files.
+
+    Progress is published to the requesting user while pages are written;
+    the finished file is registered as a private File attached to Teams
+    Settings and announced with the `teams_chat_export_complete` event.
+    """
+    user = user or frappe.session.user
+    format = get_export_format(format)
+    stamp = now_datetime().strftime("%Y%m%d%H%M%S")
+    # Chat IDs carry ':' and '@', so name the file after a short hash instead
+    chat_part = _chat_key(chat_id) if chat_id else "all"
+    file_name = f"teams_chat_export_{chat_part}_{stamp}.{format}.gz"
+    path = frappe.get_site_path("private", "files", file_name)
+
+    total = _estimated_rows(chat_id)
+    written = 0
+
+    try:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as out:
+            writer = None
+            if format == "csv":
+                writer = csv.writer(out)
+                writer.writerow(EXPORT_FIELDS)
+
+            for rows in iter_message_pages(chat_id):
+                for row in rows:
+                    if writer:
+                        writer.writerow([_csv_value(row.get(field)) for field in EXPORT_FIELDS])
+                    else:
+                        out.write(json.dumps(row, default=str, ensure_ascii=False))
+                        out.write("\n")
+                written += len(rows)
+
+                if total:
+                    frappe.publish_progress(
+                        min(written * 100 / total, 99),
+                        title=_("Exporting Teams Chat History"),
+                        description=_("{0} messages written").format(written)
+                    )
+
+        file_doc = frappe.get_doc({
+            "doctype": "File",
+            "file_name": file_name,
+            "file_url": f"/private/files/{file_name}",
+            "is_private": 1,
+            "file_size": os.path.getsize(path),
+            "attached_to_doctype": "Teams Settings",
+            "attached_to_name": "Teams Settings"
+        })
+        file_doc.insert(ignore_permissions=True)
+        frappe.db.commit()
+
+    except Exception as e:
+        if os.path.exists(path):
+            os.remove(path)
+        frappe.log_error(f"Error exporting chat history: {str(e)}", "Teams Export Error")
+        frappe.publish_realtime(EXPORT_COMPLETE_EVENT, {"success": False, "error": str(e)}, user=user)
+        raise
+
+    frappe.publish_realtime(EXPORT_COMPLETE_EVENT, {
+        "success": True,
+        "file_url": file_doc.file_url,
+        "file_name": file_name,
+        "rows": written
+    }, user=user)
+
+    return file_doc.file_url
+
+
+def get_export_format(format):
+    format = (format or "ndjson").lower()
+    # "json" exports used to be a single JSON array; NDJSON is its streaming form
+    if format == "json":
+        format = "ndjson"
+    if format not in EXPORT_FORMATS:
+        frappe.throw(_("Unsupported export format: {0}").format(format))
+    return format
+
+
+def _estimated_rows(chat_id=None):
+    """Row estimate for progress, read from the activity rollup"""
+    condition = "WHERE chat_id = %(chat_id)s" if chat_id else ""
+    total = frappe.db.sql(
+        f"SELECT SUM(message_count) FROM `tabTeams Chat Activity` {condition}",
+        {"chat_id": chat_id}
+    )[0][0]
+    return cint(total)
+
+
+def _chat_key(chat_id):
+    """Short, file-name safe stand-in for a Teams chat ID"""
+    return hashlib.sha1((chat_id or "").encode("utf-8")).hexdigest()[:12]
+
+
+def _csv_value(value):
+    return "" if value is None else value
+
+
+def run_parquet_export(full=False):
+    """
+    Write messages modified since the stored watermark, plus a snapshot of
+    all conversations, as Parquet under the analytics export directory.
+
+    Message files are hive-partitioned by `created_date` (and `chat_key`, a
+    short hash of chat_id, when Partition by Chat is set), so pandas,
+    pyarrow and DuckDB can read the tree as one dataset. Every run appends
+    new files. An edited message is written again, so readers should keep
+    the row with the latest `modified` per `name`.
+
+    Each run covers [watermark, now - lag) and stores the upper bound as
+    the next watermark, so rows still uncommitted at export time are picked
+    up by a later run instead of being skipped.
+
+    Returns the number of message rows written.
+    """
+    if pa is None:
+        frappe.throw(_("Parquet export requires pyarrow. Install it with: pip install pyarrow"))
+
+    settings = frappe.db.get_value(
+        "Teams Settings",
+        "Teams Settings",
+        ["parquet_partition_by_chat", "parquet_export_watermark"],
+        as_dict=True
+    ) or frappe._dict()
+
+    root = get_parquet_export_dir()
+    stamp = now_datetime().strftime("%Y%m%d%H%M%S")
+    watermark = None if cint(full) else settings.parquet_export_watermark
+    until = add_to_date(
+        now_datetime(),
+        minutes=-cint(frappe.conf.get("teams_parquet_export_lag_minutes") or DEFAULT_PARQUET_EXPORT_LAG_MINUTES)
+    )
+    partition_cols = ["created_date"]
+    if cint(settings.parquet_partition_by_chat):
+        partition_cols.append("chat_key")
+
+    written = 0
+    for page, rows in enumerate(_iter_modified_messages(watermark, until)):
+        table = pa.Table.from_pylist(
+            [_parquet_message_row(row) for row in rows],
+            schema=_message_schema()
+        )
+        pq.write_to_dataset(
+            table,
+            root_path=os.path.join(root, "messages"),
+            partition_cols=partition_cols,
+            basename_template=f"part-{stamp}-{page:05d}-{{i}}.parquet"
+        )
+        written += len(rows)
+
+    _write_conversation_snapshot(root)
+
+    frappe.db.set_value("Teams Settings", "Teams Settings", {
+        "parquet_export_watermark": until,
+        "last_parquet_export_rows": written
+    })
+    frappe.db.commit()
+
+    return written
+
+
+def scheduled_parquet_export():
+    """Daily job; does nothing unless the export is enabled in Teams Settings"""
+    if not cint(frappe.db.get_single_value("Teams Settings", "parquet_export_enabled")):
+        return
+
+    try:
+        run_parquet_export()
+    except Exception as e:
+        frappe.log_error(f"Parquet export failed: {str(e)}", "Teams Export Error")
+
+
+def get_parquet_export_dir():
+    path = frappe.conf.get("teams_parquet_export_dir") or frappe.get_site_path(*PARQUET_DEFAULT_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _iter_modified_messages(watermark=None, until=None, page_size=PARQUET_PAGE_SIZE):
+    """Messages with watermark <= modified < until in (modified, name) keyset pages"""
+    columns = ", ".join(f"`{field}`" for field in PARQUET_MESSAGE_FIELDS)
+    values = {"watermark": watermark, "until": until, "limit": page_size}
+    since = "modified >= %(watermark)s" if watermark else "1=1"
+    if until:
+        since += " AND modified < %(until)s"
+    cursor = None
+
+    while True:
+        if cursor:
+            values.update(modified=cursor[0], name=cursor[1])
+            keyset = "(modified > %(modified)s OR (modified = %(modified)s AND name > %(name)s))"
+        else:
+            keyset = "1=1"
+
+        rows = frappe.db.sql(
+            f"""
+            SELECT {columns} FROM `tabTeams Chat Message`
+            WHERE {since} AND {keyset}
+            ORDER BY modified, name
+            LIMIT %(limit)s
+            """,
+            values,
+            as_dict=True
+        )
+        if not rows:
+            return
+
+        yield rows
+
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1].modified, rows[-1].name)
+
+
+def _message_schema():
+    timestamp = pa.timestamp("us")
+    return pa.schema([
+        ("name", pa.string()),
+        ("chat_id", pa.string()),
+        ("message_id", pa.string()),
+        ("sender_id", pa.string()),
+        ("sender_display", pa.string()),
+        ("body", pa.string()),
+        ("body_text", pa.string()),
+        ("created_at", timestamp),
+        ("last_modified_at", timestamp),
+        ("is_deleted", pa.bool_()),
+        ("deleted_at", timestamp),
+        ("direction", pa.string()),
+        ("document_type", pa.string()),
+        ("document_name", pa.string()),
+        ("modified", timestamp),
+        ("created_date", pa.string()),
+        ("chat_key", pa.string()),
+    ])
+
+
+def _parquet_message_row(row):
+    row = dict(row)
+    row["is_deleted"] = bool(row.get("is_deleted"))
+    for field in ("created_at", "last_modified_at", "deleted_at", "modified"):
+        if row.get(field):
+            row[field] = get_datetime(row[field])
+    created = row.get("created_at")
+    row["created_date"] = created.strftime("%Y-%m-%d") if created else "unknown"
+    row["chat_key"] = _chat_key(row.get("chat_id"))
+    return row
+
+
+def _write_conversation_snapshot(root):
+    """Conversations are few; each run replaces the snapshot"""
+    rows = frappe.get_all("Teams Conversation", fields=list(CONVERSATION_EXPORT_FIELDS))
+    for row in rows:
+        for field in ("last_synced", "modified"):
+            if row.get(field):
+                row[field] = get_datetime(row[field])
+
+    timestamp = pa.timestamp("us")
+    schema = pa.schema([
+        ("name", pa.string()),
+        ("chat_id", pa.string()),
+        ("topic", pa.string()),
+        ("document_type", pa.string()),
+        ("document_name", pa.string()),
+        ("last_synced", timestamp),
+        ("modified", timestamp),
+    ])
+
+    path = os.path.join(root, "conversations.parquet")
+    pq.write_table(pa.Table.from_pylist(rows, schema=schema), path + ".tmp")
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,253 @@
+import os
+import threading
+import time
+
+import frappe
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH_API = "https://graph.microsoft.com/v1.0"
+LOGIN_API = "https://login.microsoftonline.com"
+
+# Defaults can be overridden per site in site_config.json
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 30
+
+# JSON batching limits (https://learn.microsoft.com/graph/json-batching)
+BATCH_MAX_REQUESTS = 20
+BATCH_RETRY_STATUSES = (429, 500, 502, 503, 504)
+# A 5xx on a POST/PATCH may come after Graph already applied it (a meeting
+# created, invites sent), so those are only retried when throttled
+BATCH_UNSAFE_RETRY_STATUSES = (429,)
+BATCH_IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+BATCH_MAX_BACKOFF = 30
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _conf_int(key, default):
+    try:
+        return int(frappe.conf.get(key) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def get_session():
+    """
+    Return the pooled requests.Session for this worker process.
+
+    The session is rebuilt after a fork so that gunicorn/RQ workers never share
+    sockets with their parent. Pool size is read from `teams_graph_pool_size`.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            pool_size = _conf_int("teams_graph_pool_size", DEFAULT_POOL_SIZE)
+            adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=False)
+
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.headers.update({"Accept": "application/json"})
+
+            _session = session
+            _session_pid = pid
+
+    return _session
+
+
+def get_default_timeout():
+    """(connect, read) timeout tuple from site config"""
+    return (
+        _conf_int("teams_graph_connect_timeout", DEFAULT_CONNECT_TIMEOUT),
+        _conf_int("teams_graph_timeout", DEFAULT_READ_TIMEOUT),
+    )
+
+
+class GraphClient:
+    """
+    Thin wrapper around the pooled session for Microsoft Graph calls.
+
+    Relative paths are resolved against GRAPH_API, absolute URLs (e.g. an
+    `@odata.nextLink`) are used as-is. If no token is passed, the current
+    access token is looked up on first use.
+
+    A 401 response triggers one single-flight token refresh and a retry, so
+    callers never need their own refresh-and-retry block.
+    """
+
+    def __init__(self, token=None, timeout=None, retry_on_401=True):
+        self.token = token
+        self.timeout = timeout
+        self.retry_on_401 = retry_on_401
+
+    def _url(self, path):
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{GRAPH_API}/{path.lstrip('/')}"
+
+    def _headers(self, extra=None):
+        if not self.token:
+            from .helpers import get_access_token
+
+            self.token = get_access_token()
+
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if extra:
+            headers.update(extra)
+        return headers
+
+    def _send(self, method, path, headers=None, timeout=None, **kwargs):
+        return get_session().request(
+            method,
+            self._url(path),
+            headers=self._headers(headers),
+            timeout=timeout or self.timeout or get_default_timeout(),
+            **kwargs,
+        )
+
+    def request(self, method, path, headers=None, timeout=None, **kwargs):
+        response = self._send(method, path, headers=headers, timeout=timeout, **kwargs)
+
+        if response.status_code == 401 and self.retry_on_401:
+            from .helpers import refresh_access_token_single_flight
+
+            try:
+                new_token = refresh_access_token_single_flight(stale_token=self.token)
+            except Exception as e:
+                frappe.log_error(f"Token refresh after 401 failed: {e!s}", "Teams Token Refresh Error")
+                return response
+
+            if new_token:
+                self.token = new_token
+                response = self._send(method, path, headers=headers, timeout=timeout, **kwargs)
+
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path, **kwargs):
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def batch(self, sub_requests, max_attempts=3, timeout=None):
+        """
+        Run sub-requests through the Graph `$batch` endpoint, 20 per call.
+
+        Each sub-request is a dict with `id`, `method`, `url` (relative to the
+        Graph version root) and optional `body`/`headers`. Returns a dict of
+        id -> {"status", "body", "headers"}. Items that come back throttled are
+        retried on their own, honouring Retry-After, and so are idempotent
+        (GET/PUT/DELETE) items that get a 5xx. A POST or PATCH with a 5xx is
+        returned as-is, since it may already have taken effect; everything
+        else is returned for the caller to handle per item.
+        """
+        by_id = {str(item["id"]): item for item in sub_requests}
+        pending = list(by_id)
+        results = {}
+
+        for attempt in range(max_attempts):
+            retry = []
+            wait = 0
+
+            for start in range(0, len(pending), BATCH_MAX_REQUESTS):
+                chunk = pending[start:start + BATCH_MAX_REQUESTS]
+                response = self.post(
+                    "$batch",
+                    json={"requests": [_batch_payload(req_id, by_id[req_id]) for req_id in chunk]},
+                    timeout=timeout,
+                )
+
+                if response.status_code != 200:
+                    # The whole envelope failed; every item in it shares the outcome
+                    for req_id in chunk:
+                        results[req_id] = {"status": response.status_code, "body": _safe_json(response), "headers": {}}
+                        if _should_retry(by_id[req_id], response.status_code):
+                            retry.append(req_id)
+                            wait = max(wait, _retry_after(response.headers))
+                    continue
+
+                for item in _safe_json(response).get("responses", []):
+                    req_id = str(item.get("id"))
+                    results[req_id] = {
+                        "status": item.get("status"),
+                        "body": item.get("body") or {},
+                        "headers": item.get("headers") or {},
+                    }
+                    if req_id in by_id and _should_retry(by_id[req_id], item.get("status")):
+                        retry.append(req_id)
+                        wait = max(wait, _retry_after(item.get("headers") or {}))
+
+            pending = retry
+            if not pending or attempt == max_attempts - 1:
+                break
+
+            time.sleep(min(wait or 2 ** attempt, BATCH_MAX_BACKOFF))
+
+        return results
+
+
+def _should_retry(item, status):
+    method = item.get("method", "GET").upper()
+    if method in BATCH_IDEMPOTENT_METHODS:
+        return status in BATCH_RETRY_STATUSES
+    return status in BATCH_UNSAFE_RETRY_STATUSES
+
+
+def _batch_payload(req_id, item):
+    url = item["url"]
+    payload = {"id": req_id, "method": item.get("method", "GET").upper(), "url": url if url.startswith("/") else f"/{url}"}
+
+    headers = dict(item.get("headers") or {})
+    if item.get("body") is not None:
+        payload["body"] = item["body"]
+        headers.setdefault("Content-Type", "application/json")
+    if headers:
+        payload["headers"] = headers
+
+    return payload
+
+
+def _retry_after(headers):
+    for key, value in (headers or {}).items():
+        if key.lower() == "retry-after":
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return 0
+    return 0
+
+
+def _safe_json(response):
+    try:
+        return response.json() or {}
+    except ValueError:
+        return {}
+
+
+def get_client(token=None, timeout=None, retry_on_401=True):
+    """Convenience constructor used by the API modules"""
+    return GraphClient(token=token, timeout=timeout, retry_on_401=retry_on_401)
+
+
+def post_token_request(tenant_id, data, timeout=None):
+    """POST to the Microsoft identity token endpoint over the shared session"""
+    return get_session().post(
+        f"{LOGIN_API}/{tenant_id}/oauth2/v2.0/token",
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+        data=data,
+        timeout=timeout or get_default_timeout(),
+    )
@@ -1,10 +1,27 @@
 import frappe
 import requests
+import time
 import urllib.parse
-from datetime import timedelta
-from frappe.utils import now_datetime, get_datetime
+from datetime import datetime, timedelta
+from frappe.utils import now_datetime, get_datetime, cint, cstr
 
-GRAPH_API = "https://graph.microsoft.com/v1.0"
+from .graph_client import GRAPH_API, get_client, post_token_request
+
+# Redis keys for single-flight token refresh
+TOKEN_REFRESH_LOCK_KEY = "teams_token_refresh_lock"
+TOKEN_REFRESH_LOCK_TIMEOUT = 60
+TOKEN_REFRESH_WAIT_TIMEOUT = 45
+
+# Access token cache: per-process copy backed by Redis
+ACCESS_TOKEN_CACHE_KEY = "teams_access_token"
+LOCAL_TOKEN_TTL = 60
+TOKEN_REFRESH_BUFFER = 300
+
+_local_token = {}
+
+# Negative cache of emails Azure AD does not know (guests, typos)
+UNKNOWN_USERS_CACHE_KEY = "teams_unknown_azure_users"
+DEFAULT_UNKNOWN_USER_CACHE_HOURS = 24
 
 
 def get_settings():
@@ -19,31 +36,90 @@ def get_settings():
         frappe.throw("Failed to load Teams settings")
 
 
+def set_token_cache(access_token, token_expiry):
+    """Publish the current token to Redis and this worker's local cache"""
+    _local_token.clear()
+    if not access_token:
+        frappe.cache().delete_value(ACCESS_TOKEN_CACHE_KEY)
+        return
+
+    expiry = get_datetime(token_expiry) if token_expiry else None
+    ttl = int((expiry - now_datetime()).total_seconds()) if expiry else 3600
+    if ttl <= 0:
+        return
+
+    frappe.cache().set_value(
+        ACCESS_TOKEN_CACHE_KEY,
+        {"access_token": access_token, "token_expiry": str(expiry) if expiry else None},
+        expires_in_sec=ttl,
+    )
+    _local_token.update({"access_token": access_token, "token_expiry": expiry, "cached_at": time.monotonic()})
+
+
+def clear_token_cache():
+    """Drop the cached token (called whenever Teams Settings is saved)"""
+    _local_token.clear()
+    frappe.cache().delete_value(ACCESS_TOKEN_CACHE_KEY)
+
+
+def _get_cached_token(use_local=True):
+    """
+    Return {"access_token", "token_expiry"} from the local copy, Redis or the
+    Teams Settings row, in that order. Only two columns are read from the DB.
+    """
+    if use_local and _local_token and time.monotonic() - _local_token["cached_at"] < LOCAL_TOKEN_TTL:
+        return _local_token
+
+    entry = frappe.cache().get_value(ACCESS_TOKEN_CACHE_KEY)
+    if entry and entry.get("access_token"):
+        _local_token.clear()
+        _local_token.update({
+            "access_token": entry["access_token"],
+            "token_expiry": get_datetime(entry["token_expiry"]) if entry.get("token_expiry") else None,
+            "cached_at": time.monotonic()
+        })
+        return _local_token
+
+    values = frappe.db.get_value(
+        "Teams Settings", "Teams Settings", ["access_token", "token_expiry"], as_dict=True
+    ) or {}
+    if values.get("access_token"):
+        set_token_cache(values.access_token, values.token_expiry)
+    return values
+
+
 @frappe.whitelist()
 def get_access_token():
     """Get valid access token, refresh if needed"""
     try:
-        settings = get_settings()
+        entry = _get_cached_token()
         
         # Check if we have a token
-        if not settings.access_token:
+        if not entry or not entry.get("access_token"):
             return None
         
         # Check if token is expired or will expire soon (5 minutes buffer)
-        if settings.token_expiry:
-            expiry_time = get_datetime(settings.token_expiry)
-            current_time = now_datetime()
-            time_until_expiry = expiry_time - current_time
+        if entry.get("token_expiry"):
+            seconds_left = (get_datetime(entry["token_expiry"]) - now_datetime()).total_seconds()
             
-            # If token expires in less than 5 minutes, refresh it
-            if time_until_expiry.total_seconds() < 300:
+            # Only refresh inline once the token is actually past its expiry
+            if seconds_left <= 0:
                 try:
-                    return refresh_access_token()
+                    return refresh_access_token_single_flight(stale_token=entry["access_token"])
                 except Exception as e:
                     frappe.log_error(f"Token refresh failed: {str(e)}", "Teams Token Refresh Error")
                     return None
+            
+            # Still valid (expiry is stored with a safety margin): renew in the background
+            if seconds_left < TOKEN_REFRESH_BUFFER:
+                from erpnext_teams_integration.tasks import enqueue_token_refresh
+                
+                try:
+                    enqueue_token_refresh()
+                except Exception as e:
+                    frappe.log_error(f"Failed to queue token refresh: {str(e)}", "Teams Token Refresh Error")
         
-        return settings.access_token
+        return entry["access_token"]
         
     except Exception as e:
         frappe.log_error(f"Failed to get access token: {str(e)}", "Teams Token Error")
@@ -60,7 +136,6 @@ def refresh_access_token():
             frappe.throw("No refresh token available. Please re-authenticate.")
         
         # Prepare refresh request
-        token_url = f"https://login.microsoftonline.com/{settings.tenant_id}/oauth2/v2.0/token"
         data = {
             "client_id": settings.client_id,
             "client_secret": settings.client_secret,
@@ -69,9 +144,7 @@ def refresh_access_token():
             "scope": "https://graph.microsoft.com/.default"
         }
         
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        
-        response = requests.post(token_url, data=data, headers=headers, timeout=30)
+        response = post_token_request(settings.tenant_id, data)
         
         if response.status_code != 200:
             error_data = response.text
@@ -109,6 +182,7 @@ def refresh_access_token():
         settings.save(ignore_permissions=True)
         frappe.db.commit()
         frappe.clear_cache(doctype="Teams Settings")
+        set_token_cache(settings.access_token, settings.token_expiry)
         
         return settings.access_token
         
@@ -123,83 +197,261 @@ def refresh_access_token():
         frappe.throw("An unexpected error occurred during authentication.")
 
 
+def _expires_soon(token_expiry):
+    if not token_expiry:
+        return False
+    return (get_datetime(token_expiry) - now_datetime()).total_seconds() < TOKEN_REFRESH_BUFFER
+
+
+def refresh_access_token_single_flight(stale_token=None):
+    """
+    Refresh the access token with at most one worker calling the token endpoint.
+
+    The winner of the Redis lock refreshes and publishes the new token to the
+    token cache; workers that were waiting on the lock pick it up from there
+    instead of refreshing again.
+    `stale_token` is the token the caller saw rejected, so a published token
+    equal to it is not reused.
+    """
+    cache = frappe.cache()
+    lock = cache.lock(
+        cache.make_key(TOKEN_REFRESH_LOCK_KEY),
+        timeout=TOKEN_REFRESH_LOCK_TIMEOUT,
+        blocking_timeout=TOKEN_REFRESH_WAIT_TIMEOUT,
+    )
+    acquired = lock.acquire()
+
+    try:
+        # Another worker may have refreshed while we were waiting
+        entry = cache.get_value(ACCESS_TOKEN_CACHE_KEY) or {}
+        published = entry.get("access_token")
+        if published and published != stale_token and not _expires_soon(entry.get("token_expiry")):
+            return published
+
+        if not acquired:
+            frappe.log_error("Timed out waiting for another worker to refresh the token", "Teams Token Refresh Error")
+            return None
+
+        return refresh_access_token()
+
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except Exception:
+                # Lock expired while refreshing; nothing left to release
+                pass
+
+
 @frappe.whitelist()
 def get_azure_user_id_by_email(email):
     """Get Azure user ID by email address with caching"""
     if not email:
         return None
     
+    email = cstr(email).strip()
+    return resolve_azure_ids([email]).get(email)
+
+
+@frappe.whitelist()
+def resolve_azure_ids(emails):
+    """
+    Resolve a list of emails (or User names) to Azure object IDs in bulk.
+    
+    IDs already stored on User are read with a single query; the misses are
+    looked up in Graph through $batch and written back in one UPDATE.
+    Returns {email: azure_id} for every entry that could be resolved.
+    """
+    if isinstance(emails, str):
+        emails = frappe.parse_json(emails)
+    
+    keys = list(dict.fromkeys(cstr(e).strip() for e in (emails or []) if cstr(e).strip()))
+    if not keys:
+        return {}
+    
+    resolved = {}
+    
     try:
-        # First check if we already have the Azure ID in our database
-        user_doc = frappe.db.get_value("User", {"email": email}, ["name", "azure_object_id"], as_dict=True)
-        if user_doc and user_doc.get("azure_object_id"):
-            return user_doc.azure_object_id
-        
-        # Get access token
-        token = get_access_token()
-        if not token:
-            frappe.log_error(f"No access token available to fetch Azure ID for {email}", "Teams API Error")
-            return None
-        
-        headers = {"Authorization": f"Bearer {token}"}
-        
-        # Try to get user by email
-        encoded_email = urllib.parse.quote(email, safe='')
-        url = f"{GRAPH_API}/users/{encoded_email}"
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            azure_id = response.json().get("id")
+        # One IN query for everything we may already know
+        users = frappe.get_all(
+            "User",
+            or_filters={"name": ["in", keys], "email": ["in", keys]},
+            fields=["name", "email", "azure_object_id"]
+        )
+        user_by_key = {}
+        for user in users:
+            for k in (user.name, user.email):
+                if k:
+                    user_by_key[k.lower()] = user
+        
+        # Graph lookups needed, grouped by the email we will query with
+        unknown = _get_unknown_users()
+        now_ts = time.time()
+        misses = {}
+        for key in keys:
+            user = user_by_key.get(key.lower())
+            if user and user.azure_object_id:
+                resolved[key] = user.azure_object_id
+                continue
             
-            # Cache the Azure ID in our database
-            if azure_id and user_doc:
-                try:
-                    frappe.db.set_value("User", user_doc.name, "azure_object_id", azure_id)
-                    frappe.db.commit()
-                except Exception as e:
-                    frappe.log_error(f"Failed to cache Azure ID for {email}: {str(e)}", "Teams Cache Error")
+            lookup_email = ((user.email if user else None) or key).lower()
+            if "@" not in lookup_email:
+                continue
             
-            return azure_id
+            # Skip addresses Azure AD recently told us it does not know
+            entry = unknown.get(lookup_email)
+            if entry and entry.get("expires", 0) > now_ts:
+                continue
             
-        elif response.status_code == 401:
-            # Token might be expired, try to refresh
-            try:
-                token = refresh_access_token()
-                headers["Authorization"] = f"Bearer {token}"
-                
-                response = requests.get(url, headers=headers, timeout=10)
-                if response.status_code == 200:
-                    azure_id = response.json().get("id")
-                    
-                    # Cache the Azure ID
-                    if azure_id and user_doc:
-                        try:
-                            frappe.db.set_value("User", user_doc.name, "azure_object_id", azure_id)
-                            frappe.db.commit()
-                        except Exception:
-                            pass
-                    
-                    return azure_id
-            except Exception as e:
-                frappe.log_error(f"Failed to refresh token while fetching Azure ID for {email}: {str(e)}", "Teams Token Error")
-        
-        elif response.status_code == 404:
-            frappe.log_error(f"User not found in Azure AD: {email}", "Teams User Not Found")
-        else:
-            frappe.log_error(f"Failed to fetch Azure ID for {email}: {response.status_code} - {response.text}", "Teams API Error")
+            misses.setdefault(lookup_email, []).append(key)
         
-        return None
+        if not misses:
+            return resolved
+        
+        token = get_access_token()
+        if not token:
+            frappe.log_error(f"No access token available to fetch Azure IDs for {len(misses)} user(s)", "Teams API Error")
+            return resolved
+        
+        lookup_emails = list(misses)
+        sub_requests = [
+            {
+                "id": str(i),
+                "method": "GET",
+                "url": f"/users/{urllib.parse.quote(email, safe='')}?$select=id"
+            }
+            for i, email in enumerate(lookup_emails)
+        ]
+        results = get_client(token).batch(sub_requests)
+        
+        found = {}
+        failures = []
+        for i, email in enumerate(lookup_emails):
+            result = results.get(str(i)) or {}
+            status = result.get("status")
+            azure_id = (result.get("body") or {}).get("id") if status == 200 else None
+            
+            if azure_id:
+                found[email] = azure_id
+                for key in misses[email]:
+                    resolved[key] = azure_id
+            elif status == 404:
+                # Log only the first miss; repeats are visible in the unknown users list
+                if not unknown.get(email):
+                    frappe.log_error(f"User not found in Azure AD: {email}", "Teams User Not Found")
+                _remember_unknown_user(email, unknown.get(email))
+            else:
+                failures.append(f"{email}: {status}")
+        
+        if failures:
+            frappe.log_error("Failed to fetch Azure IDs:\n" + "\n".join(failures), "Teams API Error")
+        
+        _store_azure_ids(found, user_by_key)
+        return resolved
         
     except requests.exceptions.Timeout:
-        frappe.log_error(f"Timeout while fetching Azure ID for {email}", "Teams API Timeout")
-        return None
+        frappe.log_error(f"Timeout while fetching Azure IDs for {len(keys)} user(s)", "Teams API Timeout")
+        return resolved
     except requests.exceptions.RequestException as e:
-        frappe.log_error(f"Network error while fetching Azure ID for {email}: {str(e)}", "Teams Network Error")
-        return None
+        frappe.log_error(f"Network error while fetching Azure IDs: {str(e)}", "Teams Network Error")
+        return resolved
     except Exception as e:
-        frappe.log_error(f"Unexpected error while fetching Azure ID for {email}: {str(e)}", "Teams API Error")
-        return None
+        frappe.log_error(f"Unexpected error while resolving Azure IDs: {str(e)}", "Teams API Error")
+        return resolved
+
+
+def _unknown_user_ttl():
+    # An unset Int reads as 0; the set_unknown_user_cache_hours patch stores
+    # the default, so 0 here means the cache was switched off
+    return max(cint(frappe.db.get_single_value("Teams Settings", "unknown_user_cache_hours")), 0) * 3600
+
+
+def _get_unknown_users():
+    """
+    All cached entries, expired ones included so a repeat miss keeps its
+    history. Expired entries are removed from Redis here, so the hash only
+    ever holds emails seen within the last TTL.
+    """
+    try:
+        entries = frappe.cache().hgetall(UNKNOWN_USERS_CACHE_KEY) or {}
+        now_ts = time.time()
+        for email, entry in entries.items():
+            if entry.get("expires", 0) <= now_ts:
+                frappe.cache().hdel(UNKNOWN_USERS_CACHE_KEY, email)
+        return entries
+    except Exception:
+        return {}
+
+
+def _remember_unknown_user(email, previous=None):
+    ttl = _unknown_user_ttl()
+    if not ttl:
+        return
+    
+    now_ts = time.time()
+    previous = previous or {}
+    frappe.cache().hset(UNKNOWN_USERS_CACHE_KEY, email, {
+        "first_seen": previous.get("first_seen", now_ts),
+        "last_seen": now_ts,
+        "expires": now_ts + ttl,
+        "misses": previous.get("misses", 0) + 1
+    })
+
+
+@frappe.whitelist()
+def get_unknown_azure_users():
+    """List emails currently held in the unknown Azure user cache"""
+    frappe.only_for("System Manager")
+    
+    now_ts = time.time()
+    rows = []
+    for email, entry in _get_unknown_users().items():
+        rows.append({
+            "email": email,
+            "misses": entry.get("misses", 1),
+            "first_seen": str(datetime.fromtimestamp(entry.get("first_seen", now_ts))),
+            "last_seen": str(datetime.fromtimestamp(entry.get("last_seen", now_ts))),
+            "active": entry.get("expires", 0) > now_ts
+        })
+    
+    return sorted(rows, key=lambda row: row["last_seen"], reverse=True)
+
+
+@frappe.whitelist()
+def clear_unknown_azure_users(email=None):
+    """Flush the unknown Azure user cache, or a single email from it"""
+    frappe.only_for("System Manager")
+    
+    if email:
+        frappe.cache().hdel(UNKNOWN_USERS_CACHE_KEY, cstr(email).strip().lower())
+    else:
+        frappe.cache().delete_value(UNKNOWN_USERS_CACHE_KEY)
+    
+    return {"success": True}
+
+
+def _store_azure_ids(found, user_by_key):
+    """Write newly resolved Azure IDs back to User in a single statement"""
+    updates = {}
+    for email, azure_id in found.items():
+        user = user_by_key.get(email)
+        if user:
+            updates[user.name] = azure_id
+    
+    if not updates:
+        return
+    
+    try:
+        cases = " ".join(["WHEN %s THEN %s"] * len(updates))
+        placeholders = ", ".join(["%s"] * len(updates))
+        values = [v for pair in updates.items() for v in pair] + list(updates)
+        frappe.db.sql(
+            f"UPDATE `tabUser` SET azure_object_id = CASE name {cases} END WHERE name IN ({placeholders})",
+            values
+        )
+        frappe.db.commit()
+    except Exception as e:
+        frappe.log_error(f"Failed to cache Azure IDs for {len(updates)} user(s): {str(e)}", "Teams Cache Error")
 
 
 @frappe.whitelist()
@@ -213,7 +465,7 @@ def get_login_url(docname=None):
             frappe.throw("Teams integration is not properly configured. Please check Client ID, Tenant ID, and Redirect URI.")
         
         # Required scopes for the integration
-        scope = 'User.Read OnlineMeetings.ReadWrite offline_access Chat.ReadWrite Chat.Create Chat.ReadBasic User.ReadBasic.All ChannelMessage.Send'
+        scope = 'User.Read OnlineMeetings.ReadWrite Calendars.ReadWrite offline_access Chat.ReadWrite Chat.Create Chat.ReadBasic User.ReadBasic.All ChannelMessage.Send'
         state = f'from_create_button::{docname}'
         login_url = (f"https://login.microsoftonline.com/{settings.tenant_id}/oauth2/v2.0/authorize"
                     f"?client_id={settings.client_id}&response_type=code&redirect_uri={urllib.parse.quote(settings.redirect_uri, safe='')}&response_mode=query&scope={urllib.parse.quote(scope)}&state={urllib.parse.quote(state)}")
@@ -279,8 +531,7 @@ def test_api_connection():
                 "message": "No valid access token available"
             }
         
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{GRAPH_API}/me", headers=headers, timeout=10)
+        response = get_client(token).get("me")
         
         if response.status_code == 200:
             user_data = response.json()
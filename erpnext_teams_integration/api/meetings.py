@@ -2,15 +2,15 @@
 
 import json
 from datetime import datetime, time, timedelta
+from functools import partial
 
 import frappe
 import pytz
-import requests
-from frappe.utils import get_datetime, now_datetime
+from frappe.utils import cint, get_datetime, getdate, now_datetime
 
-from .helpers import get_access_token, get_azure_user_id_by_email, get_login_url
-
-GRAPH_API = "https://graph.microsoft.com/v1.0"
+from .chat import _parse_graph_datetime
+from .graph_client import get_client
+from .helpers import get_access_token, get_login_url, resolve_azure_ids
 
 # ---------------------------------------------------------------------------
 # Supported doctypes configuration
@@ -34,6 +34,40 @@ SUPPORTED_DOCTYPES = {
     # Add more doctypes here if needed
 }
 
+# Graph recurrence pattern (type, interval) for each Event "Repeat On" value
+EVENT_RECURRENCE_PATTERNS = {
+    "Daily": ("daily", 1),
+    "Weekly": ("weekly", 1),
+    "Monthly": ("absoluteMonthly", 1),
+    "Quarterly": ("absoluteMonthly", 3),
+    "Half Yearly": ("absoluteMonthly", 6),
+    "Yearly": ("absoluteYearly", 1),
+}
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# Attendee auto-sync: a committed save marks the document pending and pushes
+# its due time back; a per-minute job syncs documents whose due time passed,
+# so a burst of saves becomes one PATCH without holding a worker. Teams sees
+# a change 5-65 seconds after the last save (debounce plus the cron tick).
+# A failed sync is retried on later runs, each one a minute further out
+ATTENDEE_SYNC_KEY = "teams_attendee_sync"
+ATTENDEE_SYNC_PENDING_KEY = "teams_attendee_sync_pending"
+ATTENDEE_SYNC_DEBOUNCE = 5
+ATTENDEE_SYNC_MAX_ATTEMPTS = 5
+ATTENDEE_SYNC_KEY_TTL = 24 * 3600
+
+# Reschedules queued from document saves; a save landing while the job runs
+# is picked up by re-checking the document, at most this many times
+AUTO_RESCHEDULE_MAX_PASSES = 3
+
+# Meeting snapshots younger than this are served without calling Graph;
+# override per site with `teams_meeting_snapshot_ttl` in site_config.json
+DEFAULT_MEETING_SNAPSHOT_TTL = 300
+
+# Older snapshots are never served: if background revalidation keeps failing
+# the read goes to Graph itself (`teams_meeting_snapshot_max_age`)
+DEFAULT_MEETING_SNAPSHOT_MAX_AGE = 3600
+
 # ---------------------------------------------------------------------------
 # Utilities
 # ---------------------------------------------------------------------------
@@ -117,10 +151,9 @@ def _extract_meeting_id_from_join_url(join_url: str, token: str) -> str | None:
         if not join_url:
             return None
 
-        headers = _headers_with_auth(token, json_content=False)
-        search_url = f"{GRAPH_API}/me/onlineMeetings?$filter=JoinWebUrl eq '{join_url}'"
+        search_url = f"me/onlineMeetings?$filter=JoinWebUrl eq '{join_url}'"
 
-        res = requests.get(search_url, headers=headers, timeout=30)
+        res = get_client(token).get(search_url)
 
         if res.status_code == 401:
             # Let the caller handle re-authentication
@@ -147,11 +180,367 @@ def _extract_meeting_id_from_join_url(join_url: str, token: str) -> str | None:
         return None
 
 
-def _headers_with_auth(token: str, json_content=True):
-    h = {"Authorization": f"Bearer {token}"}
-    if json_content:
-        h["Content-Type"] = "application/json"
-    return h
+def _get_meeting_record(doctype: str, docname: str):
+    """The stored Teams Meeting row for a document, or None"""
+    return frappe.db.get_value(
+        "Teams Meeting",
+        {"document_type": doctype, "document_name": docname},
+        ["name", "meeting_id", "join_url", "organizer_id"],
+        as_dict=True,
+    )
+
+def _save_meeting_record(doctype: str, docname: str, meeting_id: str, join_url: str, organizer_id: str | None = None):
+    """Create or update the Teams Meeting row for a document"""
+    values = {"meeting_id": meeting_id, "join_url": join_url}
+    if organizer_id:
+        values["organizer_id"] = organizer_id
+
+    existing = frappe.db.get_value("Teams Meeting", {"document_type": doctype, "document_name": docname})
+    if existing:
+        frappe.db.set_value("Teams Meeting", existing, values)
+        return existing
+
+    record = frappe.get_doc({"doctype": "Teams Meeting", "document_type": doctype, "document_name": docname, **values})
+    record.insert(ignore_permissions=True)
+    return record.name
+
+def _resolve_meeting_id(doctype: str, docname: str, join_url: str, token: str) -> str | None:
+    """
+    Meeting ID for a document's join URL from the stored record. Documents
+    linked before records were kept are looked up by JoinWebUrl once and
+    backfilled, so later calls go straight to the meeting.
+    """
+    record = _get_meeting_record(doctype, docname)
+    if record and record.meeting_id and record.join_url == join_url:
+        return record.meeting_id
+
+    if not token:
+        return None
+
+    meeting_id = _extract_meeting_id_from_join_url(join_url, token)
+    if meeting_id:
+        _save_meeting_record(doctype, docname, meeting_id, join_url)
+        frappe.db.commit()
+    return meeting_id
+
+def _organizer_id(meeting: dict) -> str | None:
+    organizer = (meeting.get("participants") or {}).get("organizer") or {}
+    return ((organizer.get("identity") or {}).get("user") or {}).get("id")
+
+
+# ---------------------------------------------------------------------------
+# Recurring series (calendar events)
+# ---------------------------------------------------------------------------
+
+def _is_recurring(doc) -> bool:
+    """Events set to repeat become one calendar-event series instead of single meetings"""
+    return (
+        doc.doctype == "Event"
+        and cint(doc.get("repeat_this_event"))
+        and doc.get("repeat_on") in EVENT_RECURRENCE_PATTERNS
+    )
+
+def _build_event_recurrence(doc, start_dt, start_utc) -> dict:
+    """
+    Graph patternedRecurrence from the Event's repeat settings. Times are
+    sent in UTC, so weekdays and dates are shifted with the start.
+    """
+    pattern_type, interval = EVENT_RECURRENCE_PATTERNS[doc.repeat_on]
+    pattern = {"type": pattern_type, "interval": interval}
+
+    if pattern_type == "weekly":
+        shift = (start_utc.date() - start_dt.date()).days
+        local_days = [i for i, day in enumerate(WEEKDAYS) if cint(doc.get(day))] or [start_dt.weekday()]
+        pattern["daysOfWeek"] = [WEEKDAYS[(i + shift) % 7] for i in local_days]
+    elif pattern_type == "absoluteMonthly":
+        pattern["dayOfMonth"] = start_utc.day
+    elif pattern_type == "absoluteYearly":
+        pattern["dayOfMonth"] = start_utc.day
+        pattern["month"] = start_utc.month
+
+    recurrence_range = {"type": "noEnd", "startDate": start_utc.date().isoformat()}
+    if doc.get("repeat_till"):
+        recurrence_range.update(type="endDate", endDate=getdate(doc.repeat_till).isoformat())
+
+    return {"pattern": pattern, "range": recurrence_range}
+
+def _participant_emails(candidates) -> list:
+    """Calendar attendees are addressed by email: first email-like key of each row"""
+    emails = []
+    for row_keys in candidates:
+        email = next((c for c in row_keys if "@" in c), None)
+        if email and email not in emails:
+            emails.append(email)
+    return emails
+
+def _build_series_payload(doc, doctype, docname, emails) -> dict:
+    """Calendar event payload for a recurring online meeting"""
+    start_dt, end_dt = _build_default_times_for_doctype(doc, doctype)
+    start_utc = datetime.strptime(to_utc_isoformat(start_dt), "%Y-%m-%dT%H:%M:%SZ")
+    end_utc = datetime.strptime(to_utc_isoformat(end_dt), "%Y-%m-%dT%H:%M:%SZ")
+
+    return {
+        "subject": _resolve_subject(doc, doctype, docname),
+        "start": {"dateTime": start_utc.isoformat(), "timeZone": "UTC"},
+        "end": {"dateTime": end_utc.isoformat(), "timeZone": "UTC"},
+        "attendees": [{"emailAddress": {"address": e}, "type": "required"} for e in emails],
+        "isOnlineMeeting": True,
+        "onlineMeetingProvider": "teamsForBusiness",
+        "recurrence": _build_event_recurrence(doc, start_dt, start_utc),
+    }
+
+def _join_url_of(data: dict) -> str | None:
+    """Join URL from either an onlineMeeting or a calendar event response"""
+    return data.get("joinUrl") or data.get("joinWebUrl") or (data.get("onlineMeeting") or {}).get("joinUrl")
+
+def _save_series_record(doctype: str, docname: str, data: dict, recurrence: dict):
+    """
+    Store the series once. The onlineMeeting ID is not part of the event
+    response; it is resolved from the join URL on first use and kept.
+    """
+    join_url = _join_url_of(data)
+    record_name = _save_meeting_record(doctype, docname, None, join_url)
+    frappe.db.set_value("Teams Meeting", record_name, {
+        "is_recurring": 1,
+        "series_event_id": data.get("id"),
+        "recurrence": json.dumps(recurrence),
+        "fetched_at": None,
+    })
+    return record_name
+
+def _series_event_id(doctype: str, docname: str, join_url: str) -> str | None:
+    record = frappe.db.get_value(
+        "Teams Meeting",
+        {"document_type": doctype, "document_name": docname},
+        ["join_url", "is_recurring", "series_event_id"],
+        as_dict=True,
+    )
+    if record and cint(record.is_recurring) and record.join_url == join_url:
+        return record.series_event_id
+    return None
+
+def _create_recurring_meeting(doc, doctype, docname, token):
+    """
+    Create one calendar event with a recurrence pattern and a Teams meeting,
+    instead of a separate onlineMeeting per occurrence.
+    """
+    try:
+        emails = _participant_emails(_participant_candidates(doc))
+        if not emails:
+            frappe.throw("No participant email addresses found for the recurring meeting.")
+
+        payload = _build_series_payload(doc, doctype, docname, emails)
+        res = get_client(token).post("me/events", json=payload)
+
+        if res.status_code == 401:
+            return {"error": "auth_required", "login_url": get_login_url(docname)}
+
+        if res.status_code not in (200, 201):
+            safe_log_error(
+                message=f"Create meeting series failed for {doctype} {docname}\nPayload={_safe_str(payload)}\nResponse={res.text}",
+                title="Teams Meeting Creation Error",
+            )
+            frappe.throw(f"Teams API error {res.status_code}")
+
+        data = res.json() or {}
+        join_url = _join_url_of(data)
+        if not join_url:
+            safe_log_error(message=f"No joinUrl in event response: {data}", title="Teams Meeting Creation Error")
+            frappe.throw("Meeting series created on Teams but no join URL returned.")
+
+        doc.db_set("custom_teams_meeting_url", join_url)
+        _save_series_record(doctype, docname, data, payload["recurrence"])
+        frappe.db.commit()
+
+        return {
+            "success": True,
+            "message": "Recurring Teams meeting series created and link saved successfully.",
+            "meeting_url": join_url,
+        }
+
+    except frappe.ValidationError:
+        raise
+    except Exception as e:
+        safe_log_error(
+            message=f"Error creating meeting series: {e}\n\n{frappe.get_traceback()}",
+            title="Teams Meeting Creation Error",
+        )
+        frappe.throw("Failed to create recurring Teams meeting. See error logs.")
+
+def _update_series_attendees(doc, series_id, token):
+    """Add missing participants to a series' calendar event"""
+    client = get_client(token)
+    res = client.get(f"me/events/{series_id}", params={"$select": "attendees"})
+    if res.status_code != 200:
+        safe_log_error(
+            message=f"Fetch meeting series failed {res.status_code}: {res.text}",
+            title="Teams Meeting Fetch Error",
+        )
+        frappe.throw("Failed to fetch existing meeting series from Teams.")
+
+    attendees = (res.json() or {}).get("attendees") or []
+    existing = {((a.get("emailAddress") or {}).get("address") or "").lower() for a in attendees}
+    new_emails = [e for e in _participant_emails(_participant_candidates(doc)) if e.lower() not in existing]
+    if not new_emails:
+        return {"success": True, "message": "No new participants to add to the meeting."}
+
+    attendees += [{"emailAddress": {"address": e}, "type": "required"} for e in new_emails]
+    patch = client.patch(f"me/events/{series_id}", json={"attendees": attendees})
+    if patch.status_code in (200, 204):
+        _invalidate_meeting_snapshot(doc.doctype, doc.name)
+        frappe.db.commit()
+        return {"success": True, "message": f"Added {len(new_emails)} new participant(s) to the meeting series."}
+
+    safe_log_error(
+        message=f"Update meeting series failed {patch.status_code}: {patch.text}",
+        title="Teams Meeting Update Error",
+    )
+    frappe.throw("Failed to update meeting series participants on Teams.")
+
+# ---------------------------------------------------------------------------
+# Meeting snapshots
+# ---------------------------------------------------------------------------
+
+def _snapshot_ttl() -> int:
+    return cint(frappe.conf.get("teams_meeting_snapshot_ttl") or DEFAULT_MEETING_SNAPSHOT_TTL)
+
+def _snapshot_max_age() -> int:
+    max_age = cint(frappe.conf.get("teams_meeting_snapshot_max_age") or DEFAULT_MEETING_SNAPSHOT_MAX_AGE)
+    return max(max_age, _snapshot_ttl())
+
+def _store_meeting_snapshot(record_name: str, data: dict, etag: str | None = None):
+    """Save the parts of a Graph onlineMeeting the details/attendees APIs serve"""
+    frappe.db.set_value("Teams Meeting", record_name, {
+        "subject": data.get("subject"),
+        "start_date_time": data.get("startDateTime"),
+        "end_date_time": data.get("endDateTime"),
+        "attendees": json.dumps((data.get("participants") or {}).get("attendees") or []),
+        "etag": etag or data.get("@odata.etag"),
+        "fetched_at": now_datetime(),
+    }, update_modified=False)
+
+def _invalidate_meeting_snapshot(doctype: str, docname: str):
+    """Force the next read to go to Graph"""
+    record = frappe.db.get_value("Teams Meeting", {"document_type": doctype, "document_name": docname})
+    if record:
+        frappe.db.set_value("Teams Meeting", record, "fetched_at", None, update_modified=False)
+
+def _fetch_meeting(token: str, meeting_id: str, etag: str | None = None):
+    """GET a meeting; returns (status_code, data, etag)"""
+    headers = {"If-None-Match": etag} if etag else None
+    res = get_client(token).get(f"me/onlineMeetings/{meeting_id}", headers=headers)
+    if res.status_code != 200:
+        return res.status_code, None, etag
+    return 200, res.json() or {}, res.headers.get("ETag")
+
+def _get_meeting_snapshot(doctype: str, docname: str, meeting_url: str, token: str):
+    """
+    Meeting data for a document, from the local snapshot when possible.
+
+    A fresh snapshot is returned as-is. A stale one is returned too, and a
+    background revalidation is queued. A missing snapshot, or one past the
+    maximum age because revalidation has not succeeded, costs a live Graph
+    call. Returns (snapshot, error_message).
+    """
+    record = frappe.db.get_value(
+        "Teams Meeting",
+        {"document_type": doctype, "document_name": docname},
+        ["name", "meeting_id", "join_url", "subject", "start_date_time", "end_date_time",
+         "attendees", "etag", "fetched_at"],
+        as_dict=True,
+    )
+
+    if record and record.meeting_id and record.join_url == meeting_url and record.fetched_at:
+        age = (now_datetime() - get_datetime(record.fetched_at)).total_seconds()
+        if age <= _snapshot_max_age():
+            if age > _snapshot_ttl():
+                frappe.enqueue(
+                    "erpnext_teams_integration.api.meetings.refresh_meeting_snapshot",
+                    queue="short",
+                    job_id=f"teams_meeting_snapshot::{record.name}",
+                    deduplicate=True,
+                    record_name=record.name,
+                )
+            return _snapshot_from_record(record), None
+
+        if not token:
+            return None, "auth_required"
+
+        status, data, etag = _fetch_meeting(token, record.meeting_id, record.etag)
+        if status == 304:
+            frappe.db.set_value("Teams Meeting", record.name, "fetched_at", now_datetime(), update_modified=False)
+            frappe.db.commit()
+            return _snapshot_from_record(record), None
+        if status != 200:
+            return None, f"Graph returned {status}"
+
+        _store_meeting_snapshot(record.name, data, etag)
+        frappe.db.commit()
+        return _snapshot_from_data(data), None
+
+    if not token:
+        return None, "auth_required"
+
+    meeting_id = _resolve_meeting_id(doctype, docname, meeting_url, token)
+    if not meeting_id:
+        return None, "not_found"
+
+    status, data, etag = _fetch_meeting(token, meeting_id)
+    if status != 200:
+        return None, f"Graph returned {status}"
+
+    record_name = _save_meeting_record(doctype, docname, meeting_id, meeting_url, _organizer_id(data))
+    _store_meeting_snapshot(record_name, data, etag)
+    frappe.db.commit()
+
+    return _snapshot_from_data(data), None
+
+def _snapshot_from_data(data: dict) -> dict:
+    return {
+        "subject": data.get("subject"),
+        "startDateTime": data.get("startDateTime"),
+        "endDateTime": data.get("endDateTime"),
+        "attendees": (data.get("participants") or {}).get("attendees") or [],
+    }
+
+def _snapshot_from_record(record) -> dict:
+    try:
+        attendees = json.loads(record.attendees) if isinstance(record.attendees, str) else (record.attendees or [])
+    except ValueError:
+        attendees = []
+    return {
+        "subject": record.subject,
+        "startDateTime": record.start_date_time,
+        "endDateTime": record.end_date_time,
+        "attendees": attendees,
+    }
+
+def refresh_meeting_snapshot(record_name: str):
+    """Background job: revalidate one meeting snapshot against Graph"""
+    record = frappe.db.get_value("Teams Meeting", record_name, ["meeting_id", "etag"], as_dict=True)
+    if not record or not record.meeting_id:
+        return
+
+    token = get_access_token()
+    if not token:
+        return
+
+    status, data, etag = _fetch_meeting(token, record.meeting_id, record.etag)
+    if status == 304:
+        frappe.db.set_value("Teams Meeting", record_name, "fetched_at", now_datetime(), update_modified=False)
+    elif status == 200:
+        _store_meeting_snapshot(record_name, data, etag)
+    elif status == 404:
+        # Gone on Teams; drop the snapshot so the next read reports it
+        frappe.db.set_value("Teams Meeting", record_name, "fetched_at", None, update_modified=False)
+    else:
+        safe_log_error(
+            message=f"Meeting snapshot refresh failed {status} for {record_name}",
+            title="Teams Meeting Fetch Error",
+        )
+        return
+    frappe.db.commit()
+
 
 def _build_default_times_for_doctype(doc, doctype: str):
     """
@@ -196,9 +585,9 @@ def _build_attendees_from_participants_list(participants_list):
         attendees.append({"identity": {"user": {"id": azure_id}}})
     return attendees
 
-def _collect_participants_azure_ids(doc):
+def _participant_candidates(doc):
     """
-    From the supported doctype, collect participant Azure Object IDs.
+    Lookup keys (User, then email) for each participant row of the doc.
     """
     doctype = doc.doctype
     if doctype not in SUPPORTED_DOCTYPES:
@@ -208,29 +597,32 @@ def _collect_participants_azure_ids(doc):
     participants_field = cfg["participants_field"]
     email_field = cfg["email_field"]
 
-    azure_ids = set()
     rows = getattr(doc, participants_field, []) or []
 
-    for row in rows:
-        azure = None
-        # Prefer linked User if present
-        if getattr(row, "user", None):
-            azure = frappe.db.get_value("User", row.user, "azure_object_id")
-
-        # Fallback: resolve by email
-        if not azure:
-            email_val = getattr(row, email_field, None)
-            if email_val:
-                # First try cached user field to avoid Graph lookup if already stored
-                azure = frappe.db.get_value("User", email_val, "azure_object_id")
-                if not azure:
-                    azure = get_azure_user_id_by_email(email_val)
+    # Prefer linked User if present, fall back to the row email
+    return [
+        [c for c in (getattr(row, "user", None), getattr(row, email_field, None)) if c]
+        for row in rows
+    ]
 
+def _pick_azure_ids(candidates, resolved):
+    """First resolved key of each participant row, deduplicated"""
+    azure_ids = set()
+    for row_keys in candidates:
+        azure = next((resolved[c] for c in row_keys if resolved.get(c)), None)
         if azure:
             azure_ids.add(azure)
 
     return list(azure_ids)
 
+def _collect_participants_azure_ids(doc):
+    """
+    From the supported doctype, collect participant Azure Object IDs.
+    """
+    candidates = _participant_candidates(doc)
+    resolved = resolve_azure_ids([c for row_keys in candidates for c in row_keys])
+    return _pick_azure_ids(candidates, resolved)
+
 # ---------------------------------------------------------------------------
 # API: Create or Update meeting
 # ---------------------------------------------------------------------------
@@ -251,13 +643,20 @@ def create_meeting(docname, doctype):
 
         doc = frappe.get_doc(doctype, docname)
 
+        # Series invite attendees by email; only onlineMeetings need Azure IDs
+        existing_meeting_url = doc.get("custom_teams_meeting_url")
+        series_id = _series_event_id(doctype, docname, existing_meeting_url) if existing_meeting_url else None
+        if series_id:
+            return _update_series_attendees(doc, series_id, token)
+        if not existing_meeting_url and _is_recurring(doc):
+            return _create_recurring_meeting(doc, doctype, docname, token)
+
         azure_ids = _collect_participants_azure_ids(doc)
         if not azure_ids:
             frappe.throw("No valid participants with Azure ID found for meeting creation.")
 
-        existing_meeting_url = doc.get("custom_teams_meeting_url")
         if existing_meeting_url:
-            return _update_existing_meeting(doc, azure_ids, existing_meeting_url, token)
+            return _update_existing_meeting(doc, doctype, docname, azure_ids, existing_meeting_url, token)
 
         return _create_new_meeting(doc, doctype, docname, azure_ids, token)
 
@@ -272,18 +671,18 @@ def create_meeting(docname, doctype):
         )
         frappe.throw("Failed to create Teams meeting. Please check the error logs.")
 
-def _update_existing_meeting(doc, azure_ids, meeting_url, token):
+def _update_existing_meeting(doc, doctype, docname, azure_ids, meeting_url, token):
     """
     Add any missing attendees to an existing meeting.
     """
     try:
-        meeting_id = _extract_meeting_id_from_join_url(meeting_url, token)
+        meeting_id = _resolve_meeting_id(doctype, docname, meeting_url, token)
         if not meeting_id:
             frappe.throw("Could not extract meeting ID from existing meeting URL.")
 
-        headers = _headers_with_auth(token, json_content=False)
-        get_url = f"{GRAPH_API}/me/onlineMeetings/{meeting_id}"
-        res = requests.get(get_url, headers=headers, timeout=30)
+        client = get_client(token)
+        get_url = f"me/onlineMeetings/{meeting_id}"
+        res = client.get(get_url)
 
         if res.status_code == 401:
             return {"error": "auth_required", "login_url": get_login_url(doc.name)}
@@ -306,10 +705,10 @@ def _update_existing_meeting(doc, azure_ids, meeting_url, token):
         updated_attendees = existing_attendees + _build_attendees_from_participants_list(new_ids)
 
         patch_payload = {"participants": {"attendees": updated_attendees}}
-        patch = requests.patch(
-            get_url, headers=_headers_with_auth(token), json=patch_payload, timeout=30
-        )
+        patch = client.patch(get_url, json=patch_payload)
         if patch.status_code in (200, 204):
+            _invalidate_meeting_snapshot(doc.doctype, doc.name)
+            frappe.db.commit()
             return {"success": True, "message": f"Added {len(new_ids)} new participant(s) to the meeting."}
 
         safe_log_error(
@@ -327,34 +726,32 @@ def _update_existing_meeting(doc, azure_ids, meeting_url, token):
         )
         frappe.throw("Failed to update existing Teams meeting. Check error logs.")
 
-def _create_new_meeting(doc, doctype, docname, azure_ids, token):
+def _build_meeting_payload(doc, doctype, docname, azure_ids):
     """
-    Create a new Teams meeting with safe defaults.
+    onlineMeeting create payload with safe defaults.
     """
-    try:
-        subject = _resolve_subject(doc, doctype, docname)
+    subject = _resolve_subject(doc, doctype, docname)
 
-        start_dt, end_dt = _build_default_times_for_doctype(doc, doctype)
-        if start_dt >= end_dt:
-            end_dt = start_dt + timedelta(hours=1)
+    start_dt, end_dt = _build_default_times_for_doctype(doc, doctype)
+    if start_dt >= end_dt:
+        end_dt = start_dt + timedelta(hours=1)
 
-        start_iso = to_utc_isoformat(start_dt)
-        end_iso = to_utc_isoformat(end_dt)
+    return {
+        "subject": subject,
+        "startDateTime": to_utc_isoformat(start_dt),
+        "endDateTime": to_utc_isoformat(end_dt),
+        "participants": {"attendees": _build_attendees_from_participants_list(azure_ids)},
+        "isOnlineMeeting": True,
+    }
 
-        payload = {
-            "subject": subject,
-            "startDateTime": start_iso,
-            "endDateTime": end_iso,
-            "participants": {"attendees": _build_attendees_from_participants_list(azure_ids)},
-            "isOnlineMeeting": True,
-        }
+def _create_new_meeting(doc, doctype, docname, azure_ids, token):
+    """
+    Create a new Teams meeting with safe defaults.
+    """
+    try:
+        payload = _build_meeting_payload(doc, doctype, docname, azure_ids)
 
-        res = requests.post(
-            f"{GRAPH_API}/me/onlineMeetings",
-            headers=_headers_with_auth(token),
-            json=payload,
-            timeout=30,
-        )
+        res = get_client(token).post("me/onlineMeetings", json=payload)
 
         if res.status_code == 401:
             return {"error": "auth_required", "login_url": get_login_url(docname)}
@@ -374,6 +771,8 @@ def _create_new_meeting(doc, doctype, docname, azure_ids, token):
             frappe.throw("Meeting created on Teams but no join URL returned.")
 
         doc.db_set("custom_teams_meeting_url", join_url)
+        record_name = _save_meeting_record(doctype, docname, data.get("id"), join_url, _organizer_id(data))
+        _store_meeting_snapshot(record_name, data, res.headers.get("ETag"))
         frappe.db.commit()
 
         return {
@@ -391,6 +790,480 @@ def _create_new_meeting(doc, doctype, docname, azure_ids, token):
         )
         frappe.throw("Failed to create new Teams meeting. See error logs.")
 
+# ---------------------------------------------------------------------------
+# Attendee auto-sync (doc_events)
+# ---------------------------------------------------------------------------
+
+def on_participants_update(doc, method=None):
+    """
+    on_update hook: queue an attendee sync when the participant table of a
+    document with a meeting changed. Rapid saves collapse into one update,
+    sent by the per-minute sweep 5-65 seconds after the last save.
+    """
+    if doc.doctype not in SUPPORTED_DOCTYPES or not doc.get("custom_teams_meeting_url"):
+        return
+    if not _is_enabled_doctype(doc.doctype):
+        return
+
+    before = doc.get_doc_before_save()
+    new_keys = _participant_keys(doc)
+    old_keys = _participant_keys(before) if before else set()
+    if before and new_keys == old_keys:
+        return
+
+    # Redis is not transactional: nothing is recorded unless the save commits
+    removed = {c for row_keys in old_keys - new_keys for c in row_keys}
+    frappe.db.after_commit.add(partial(_mark_attendee_sync_due, doc.doctype, doc.name, removed))
+
+def _mark_attendee_sync_due(doctype, docname, removed):
+    cache = frappe.cache()
+    key = _attendee_sync_key(doctype, docname)
+
+    # Remember who was taken off, so a later coalesced sync still removes them
+    if removed:
+        cache.sadd(f"{key}::removed", *removed)
+        cache.expire(cache.make_key(f"{key}::removed"), ATTENDEE_SYNC_KEY_TTL)
+
+    _set_attendee_sync_due(doctype, docname, ATTENDEE_SYNC_DEBOUNCE, attempts=0)
+    cache.sadd(ATTENDEE_SYNC_PENDING_KEY, json.dumps([doctype, docname]))
+
+def sync_due_meeting_attendees():
+    """
+    Scheduled every minute: sync the attendees of documents whose last
+    participant change is older than the debounce, so a change reaches
+    Teams 5-65 seconds after the last save.
+
+    Each pending document is claimed with SPOP, so concurrent runs never
+    sync the same one twice. A save that lands during the sync marks the
+    document pending again and the next run picks it up. A failed sync puts
+    the document back with a later due time, up to ATTENDEE_SYNC_MAX_ATTEMPTS.
+    """
+    cache = frappe.cache()
+    not_due = []
+    now = now_datetime()
+
+    while True:
+        member = cache.spop(ATTENDEE_SYNC_PENDING_KEY)
+        if not member:
+            break
+        doctype, docname = json.loads(member.decode() if isinstance(member, bytes) else member)
+
+        claimed = _get_attendee_sync_due(doctype, docname)
+        if claimed and get_datetime(claimed["due"]) > now:
+            not_due.append(member)
+            continue
+
+        if sync_meeting_attendees(doctype, docname):
+            continue
+
+        # A save during the sync already re-marked the document as due
+        if _get_attendee_sync_due(doctype, docname) != claimed:
+            continue
+
+        attempts = cint((claimed or {}).get("attempts")) + 1
+        if attempts >= ATTENDEE_SYNC_MAX_ATTEMPTS:
+            safe_log_error(
+                message=f"Giving up attendee sync for {doctype} {docname} after {attempts} attempts",
+                title="Teams Meeting Update Error",
+            )
+            cache.delete(cache.make_key(f"{_attendee_sync_key(doctype, docname)}::due"))
+            continue
+
+        _set_attendee_sync_due(doctype, docname, 60 * attempts, attempts)
+        not_due.append(member)
+
+    if not_due:
+        cache.sadd(ATTENDEE_SYNC_PENDING_KEY, *not_due)
+
+def _get_attendee_sync_due(doctype, docname):
+    cache = frappe.cache()
+    value = cache.get(cache.make_key(f"{_attendee_sync_key(doctype, docname)}::due"))
+    if not value:
+        return None
+    try:
+        return json.loads(value.decode() if isinstance(value, bytes) else value)
+    except ValueError:
+        return None
+
+def _set_attendee_sync_due(doctype, docname, delay, attempts):
+    cache = frappe.cache()
+    due = now_datetime() + timedelta(seconds=delay)
+    cache.set(
+        cache.make_key(f"{_attendee_sync_key(doctype, docname)}::due"),
+        json.dumps({"due": str(due), "attempts": attempts}),
+        ex=ATTENDEE_SYNC_KEY_TTL,
+    )
+
+def sync_meeting_attendees(doctype, docname) -> bool:
+    """
+    Bring the meeting's attendees in line with the document with a single
+    PATCH. Returns False if the sync should be tried again.
+    """
+    cache = frappe.cache()
+    key = _attendee_sync_key(doctype, docname)
+    removed_keys = {k.decode() if isinstance(k, bytes) else k for k in cache.smembers(f"{key}::removed") or []}
+
+    try:
+        doc = frappe.get_doc(doctype, docname)
+        meeting_url = doc.get("custom_teams_meeting_url")
+        if not meeting_url:
+            # Meeting removed since the save; nothing left to sync
+            return True
+
+        token = get_access_token()
+        if not token:
+            return False
+
+        series_id = _series_event_id(doctype, docname, meeting_url)
+        if series_id:
+            synced = _sync_series_attendees(doc, series_id, removed_keys, token)
+        else:
+            synced = _sync_online_meeting_attendees(doc, meeting_url, removed_keys, token)
+
+        if synced and removed_keys:
+            cache.srem(f"{key}::removed", *removed_keys)
+        frappe.db.commit()
+        return synced
+
+    except frappe.DoesNotExistError:
+        return True
+    except Exception as e:
+        frappe.db.rollback()
+        safe_log_error(
+            message=f"Attendee sync failed for {doctype} {docname}: {e}\n\n{frappe.get_traceback()}",
+            title="Teams Meeting Update Error",
+        )
+        return False
+
+def _sync_online_meeting_attendees(doc, meeting_url, removed_keys, token) -> bool:
+    meeting_id = _resolve_meeting_id(doc.doctype, doc.name, meeting_url, token)
+    if not meeting_id:
+        return False
+
+    status, data, _ = _fetch_meeting(token, meeting_id)
+    if status != 200:
+        safe_log_error(message=f"Fetch meeting for attendee sync failed {status}", title="Teams Meeting Fetch Error")
+        return False
+
+    candidates = _participant_candidates(doc)
+    resolved = resolve_azure_ids([c for row_keys in candidates for c in row_keys] + list(removed_keys))
+    desired = set(_pick_azure_ids(candidates, resolved))
+    removed = {resolved.get(k) for k in removed_keys if resolved.get(k)} - desired
+
+    current = (data.get("participants") or {}).get("attendees") or []
+    current_ids = {((a.get("identity") or {}).get("user") or {}).get("id") for a in current if a}
+    to_add = desired - current_ids
+    to_remove = current_ids & removed
+    if not to_add and not to_remove:
+        return True
+
+    attendees = [
+        a for a in current
+        if ((a.get("identity") or {}).get("user") or {}).get("id") not in to_remove
+    ] + _build_attendees_from_participants_list(sorted(to_add))
+
+    res = get_client(token).patch(
+        f"me/onlineMeetings/{meeting_id}", json={"participants": {"attendees": attendees}}
+    )
+    if res.status_code not in (200, 204):
+        safe_log_error(
+            message=f"Attendee sync PATCH failed {res.status_code}: {res.text}",
+            title="Teams Meeting Update Error",
+        )
+        return False
+
+    _invalidate_meeting_snapshot(doc.doctype, doc.name)
+    return True
+
+def _sync_series_attendees(doc, series_id, removed_keys, token) -> bool:
+    client = get_client(token)
+    res = client.get(f"me/events/{series_id}", params={"$select": "attendees"})
+    if res.status_code != 200:
+        safe_log_error(message=f"Fetch series for attendee sync failed {res.status_code}", title="Teams Meeting Fetch Error")
+        return False
+
+    desired = {e.lower() for e in _participant_emails(_participant_candidates(doc))}
+    removed = {k.lower() for k in removed_keys if "@" in k} - desired
+
+    current = (res.json() or {}).get("attendees") or []
+    current_emails = {((a.get("emailAddress") or {}).get("address") or "").lower() for a in current}
+    to_add = desired - current_emails
+    to_remove = current_emails & removed
+    if not to_add and not to_remove:
+        return True
+
+    attendees = [
+        a for a in current
+        if ((a.get("emailAddress") or {}).get("address") or "").lower() not in to_remove
+    ] + [{"emailAddress": {"address": e}, "type": "required"} for e in sorted(to_add)]
+
+    patch = client.patch(f"me/events/{series_id}", json={"attendees": attendees})
+    if patch.status_code not in (200, 204):
+        safe_log_error(
+            message=f"Series attendee sync PATCH failed {patch.status_code}: {patch.text}",
+            title="Teams Meeting Update Error",
+        )
+        return False
+
+    _invalidate_meeting_snapshot(doc.doctype, doc.name)
+    return True
+
+def on_schedule_update(doc, method=None):
+    """
+    on_update hook: queue a reschedule when the meeting times derived from
+    the document changed. One job per document; repeated saves share it.
+    """
+    if doc.doctype not in SUPPORTED_DOCTYPES or not doc.get("custom_teams_meeting_url"):
+        return
+    if not _is_enabled_doctype(doc.doctype):
+        return
+
+    before = doc.get_doc_before_save()
+    if not before:
+        return
+
+    # Without a stored start the builder falls back to "now", so only
+    # compare built times when a time field actually changed
+    cfg = SUPPORTED_DOCTYPES[doc.doctype]
+    fields = [cfg.get("start_field"), cfg.get("end_field")]
+    if all(before.get(f) == doc.get(f) for f in fields if f):
+        return
+    if _build_default_times_for_doctype(before, doc.doctype) == _build_default_times_for_doctype(doc, doc.doctype):
+        return
+
+    frappe.enqueue(
+        "erpnext_teams_integration.api.meetings.reschedule_meeting_from_doc",
+        queue="short",
+        job_id=f"teams_meeting_reschedule::{doc.doctype}::{doc.name}",
+        deduplicate=True,
+        enqueue_after_commit=True,
+        doctype=doc.doctype,
+        docname=doc.name,
+    )
+
+def reschedule_meeting_from_doc(doctype, docname):
+    """
+    Background job: move the meeting to the document's current times.
+    Skips Graph when the cached snapshot already has those times.
+    """
+    for _ in range(AUTO_RESCHEDULE_MAX_PASSES):
+        doc = frappe.get_doc(doctype, docname)
+        if not doc.get("custom_teams_meeting_url"):
+            return
+
+        target = _reschedule_target(doc, doctype)
+        if _snapshot_has_times(doctype, docname, doc.custom_teams_meeting_url, target):
+            return
+
+        try:
+            result = reschedule_meeting(docname, doctype)
+        except Exception as e:
+            safe_log_error(
+                message=f"Automatic reschedule failed for {doctype} {docname}: {e}",
+                title="Teams Meeting Reschedule Error",
+            )
+            return
+        if not (result or {}).get("success"):
+            return
+
+        # Another save may have changed the times while this job ran
+        if _reschedule_target(frappe.get_doc(doctype, docname), doctype) == target:
+            return
+
+def _reschedule_target(doc, doctype):
+    """(start, end) in UTC ISO, as reschedule_meeting would send them"""
+    start_dt, end_dt = _build_default_times_for_doctype(doc, doctype)
+    if start_dt and end_dt and start_dt >= end_dt:
+        end_dt = start_dt + timedelta(hours=1)
+    return to_utc_isoformat(start_dt), to_utc_isoformat(end_dt)
+
+def _snapshot_has_times(doctype, docname, meeting_url, target) -> bool:
+    """
+    True if a snapshot no older than the snapshot max age already shows the
+    target (start, end) in UTC. An older one may miss an edit made in Teams,
+    so the PATCH goes out.
+    """
+    snapshot = frappe.db.get_value(
+        "Teams Meeting",
+        {"document_type": doctype, "document_name": docname},
+        ["join_url", "start_date_time", "end_date_time", "fetched_at"],
+        as_dict=True,
+    )
+    if not snapshot or not snapshot.fetched_at or snapshot.join_url != meeting_url:
+        return False
+    if (now_datetime() - get_datetime(snapshot.fetched_at)).total_seconds() > _snapshot_max_age():
+        return False
+
+    stored = (_parse_graph_datetime(snapshot.start_date_time), _parse_graph_datetime(snapshot.end_date_time))
+    wanted = (_parse_graph_datetime(target[0]), _parse_graph_datetime(target[1]))
+    if None in stored or None in wanted:
+        return False
+    # Graph reports sub-second precision; compare to the second
+    return tuple(dt.replace(microsecond=0) for dt in stored) == tuple(dt.replace(microsecond=0) for dt in wanted)
+
+def _participant_keys(doc) -> set:
+    return {tuple(row_keys) for row_keys in _participant_candidates(doc) if row_keys}
+
+def _attendee_sync_key(doctype, docname) -> str:
+    return f"{ATTENDEE_SYNC_KEY}::{doctype}::{docname}"
+
+def _is_enabled_doctype(doctype) -> bool:
+    """Doctypes listed in Teams Settings; an empty list enables all supported ones"""
+    enabled = frappe.get_all(
+        "Teams Enabled Doctype",
+        filters={"parent": "Teams Settings", "parenttype": "Teams Settings"},
+        pluck="doctype_name",
+    )
+    return not enabled or doctype in enabled
+
+# ---------------------------------------------------------------------------
+# API: Bulk create
+# ---------------------------------------------------------------------------
+
+BULK_MEETING_LIMIT = 500
+BULK_MEETINGS_COMPLETE_EVENT = "teams_bulk_meetings_complete"
+
+@frappe.whitelist()
+def create_meetings_bulk(doctype, docnames=None, filters=None):
+    """
+    Queue meeting creation for many documents of one doctype.
+    Pass `docnames` (list or JSON list) or `filters` (dict or JSON) for frappe.get_all.
+    Per-document results are returned by the job and sent to the caller with
+    the `teams_bulk_meetings_complete` realtime event.
+    """
+    if doctype not in SUPPORTED_DOCTYPES:
+        frappe.throw(f"Doctype {doctype} is not supported for Teams meetings.")
+
+    if isinstance(docnames, str):
+        docnames = json.loads(docnames)
+    if isinstance(filters, str):
+        filters = json.loads(filters)
+
+    if not docnames:
+        if not filters:
+            frappe.throw("Pass either document names or filters.")
+        docnames = frappe.get_all(doctype, filters=filters, pluck="name", limit=BULK_MEETING_LIMIT + 1)
+
+    docnames = list(dict.fromkeys(docnames))
+    if len(docnames) > BULK_MEETING_LIMIT:
+        frappe.throw(f"At most {BULK_MEETING_LIMIT} documents can be scheduled at once.")
+
+    for name in docnames:
+        frappe.has_permission(doctype, "write", doc=name, throw=True)
+
+    if not docnames:
+        return {"success": True, "queued": 0, "message": "No matching documents."}
+
+    if not get_access_token():
+        return {"error": "auth_required", "login_url": get_login_url()}
+
+    frappe.enqueue(
+        "erpnext_teams_integration.api.meetings.run_bulk_meeting_creation",
+        queue="long",
+        timeout=1800,
+        doctype=doctype,
+        docnames=docnames,
+        user=frappe.session.user,
+    )
+
+    return {"success": True, "queued": len(docnames), "message": f"Creating meetings for {len(docnames)} document(s)."}
+
+def run_bulk_meeting_creation(doctype, docnames, user=None):
+    """
+    Background job behind create_meetings_bulk.
+
+    Participants of every document are resolved in one lookup, meetings are
+    created through Graph $batch (20 per round trip) and all join URLs are
+    written back with a single UPDATE. Returns {docname: {"status", ...}}.
+    """
+    results = {}
+    docs = {}
+    candidates = {}
+
+    for name in docnames:
+        try:
+            doc = frappe.get_doc(doctype, name)
+        except frappe.DoesNotExistError:
+            results[name] = {"status": "error", "message": "Document not found."}
+            continue
+        if doc.get("custom_teams_meeting_url"):
+            results[name] = {"status": "skipped", "message": "Meeting already exists.", "meeting_url": doc.custom_teams_meeting_url}
+            continue
+        docs[name] = doc
+        candidates[name] = _participant_candidates(doc)
+
+    resolved = resolve_azure_ids([c for rows in candidates.values() for row_keys in rows for c in row_keys])
+
+    sub_requests = []
+    for index, (name, doc) in enumerate(docs.items()):
+        # Repeating Events become one calendar-event series each, invited by email
+        if _is_recurring(doc):
+            emails = _participant_emails(candidates[name])
+            if not emails:
+                results[name] = {"status": "error", "message": "No participant email addresses found."}
+                continue
+            url, body = "/me/events", _build_series_payload(doc, doctype, name, emails)
+        else:
+            azure_ids = _pick_azure_ids(candidates[name], resolved)
+            if not azure_ids:
+                results[name] = {"status": "error", "message": "No valid participants with Azure ID found."}
+                continue
+            url, body = "/me/onlineMeetings", _build_meeting_payload(doc, doctype, name, azure_ids)
+        sub_requests.append({"id": str(index), "method": "POST", "url": url, "body": body, "docname": name})
+
+    created = {}
+    responses = {}
+    if sub_requests:
+        token = get_access_token()
+        if not token:
+            for req in sub_requests:
+                results[req["docname"]] = {"status": "error", "message": "Authentication required."}
+            sub_requests = []
+        else:
+            responses = get_client(token).batch(sub_requests)
+
+        for req in sub_requests:
+            name = req["docname"]
+            item = responses.get(req["id"]) or {}
+            data = item.get("body") or {}
+            join_url = _join_url_of(data)
+            if item.get("status") in (200, 201) and join_url:
+                created[name] = (data, req["body"].get("recurrence"))
+                results[name] = {"status": "created", "meeting_url": join_url}
+            else:
+                safe_log_error(
+                    message=f"Bulk create meeting failed for {doctype} {name}: {item.get('status')} {_safe_str(data)}",
+                    title="Teams Meeting Creation Error",
+                )
+                results[name] = {"status": "error", "message": f"Teams API error {item.get('status')}"}
+
+    if created:
+        _write_join_urls(doctype, {name: _join_url_of(data) for name, (data, _) in created.items()})
+        for name, (data, recurrence) in created.items():
+            if recurrence:
+                _save_series_record(doctype, name, data, recurrence)
+                continue
+            record_name = _save_meeting_record(doctype, name, data.get("id"), _join_url_of(data), _organizer_id(data))
+            _store_meeting_snapshot(record_name, data)
+        frappe.db.commit()
+
+    frappe.publish_realtime(BULK_MEETINGS_COMPLETE_EVENT, {"doctype": doctype, "results": results}, user=user or frappe.session.user)
+    return results
+
+def _write_join_urls(doctype, join_urls):
+    """Set custom_teams_meeting_url on many documents with one UPDATE"""
+    cases = " ".join(["WHEN %s THEN %s"] * len(join_urls))
+    values = [v for name, url in join_urls.items() for v in (name, url)]
+    frappe.db.sql(
+        f"""
+        UPDATE `tab{doctype}`
+        SET custom_teams_meeting_url = CASE name {cases} END,
+            modified = %s, modified_by = %s
+        WHERE name IN %s
+        """,
+        (*values, now_datetime(), frappe.session.user, tuple(join_urls)),
+    )
+
 # ---------------------------------------------------------------------------
 # API: Details
 # ---------------------------------------------------------------------------
@@ -406,37 +1279,26 @@ def get_meeting_details(docname, doctype):
         if not meeting_url:
             return {"exists": False, "message": "No Teams meeting found for this document."}
         
-        token = get_access_token()
-
-        meeting_id = _extract_meeting_id_from_join_url(meeting_url, token)
-        if not meeting_id:
-            return {"exists": True, "url": meeting_url, "message": "Meeting URL exists but ID not extractable."}
-
-        if not token:
+        snapshot, error = _get_meeting_snapshot(doctype, docname, meeting_url, get_access_token())
+        if error == "auth_required":
             return {
                 "exists": True,
                 "url": meeting_url,
                 "message": "Meeting exists but cannot fetch details (authentication required).",
             }
-
-        res = requests.get(
-            f"{GRAPH_API}/me/onlineMeetings/{meeting_id}",
-            headers=_headers_with_auth(token, json_content=False),
-            timeout=30,
-        )
-        if res.status_code != 200:
+        if error == "not_found":
+            return {"exists": True, "url": meeting_url, "message": "Meeting URL exists but ID not extractable."}
+        if error:
             return {"exists": True, "url": meeting_url, "message": "Meeting URL exists but details unavailable."}
 
-        data = res.json() or {}
-        attendees = data.get("participants", {}).get("attendees", []) or []
         return {
             "exists": True,
             "url": meeting_url,
             "details": {
-                "subject": data.get("subject"),
-                "startDateTime": data.get("startDateTime"),
-                "endDateTime": data.get("endDateTime"),
-                "participants": len(attendees),
+                "subject": snapshot["subject"],
+                "startDateTime": snapshot["startDateTime"],
+                "endDateTime": snapshot["endDateTime"],
+                "participants": len(snapshot["attendees"]),
             },
         }
 
@@ -464,25 +1326,29 @@ def delete_meeting(docname, doctype):
         
         token = get_access_token()
 
-        meeting_id = _extract_meeting_id_from_join_url(meeting_url, token)
-        if not meeting_id:
-            # Can't delete remotely; clear URL locally.
-            doc.db_set("custom_teams_meeting_url", "")
-            frappe.db.commit()
-            return {"success": True, "message": "Meeting URL cleared (could not extract meeting ID)."}
-
         if not token:
             return {"error": "auth_required", "message": "Authentication required to delete meeting."}
 
-        res = requests.delete(
-            f"{GRAPH_API}/me/onlineMeetings/{meeting_id}",
-            headers=_headers_with_auth(token, json_content=False),
-            timeout=30,
-        )
+        # A series is removed with its calendar event, which also ends its meeting
+        series_id = _series_event_id(doctype, docname, meeting_url)
+        if series_id:
+            path = f"me/events/{series_id}"
+        else:
+            meeting_id = _resolve_meeting_id(doctype, docname, meeting_url, token)
+            if not meeting_id:
+                # Can't delete remotely; clear URL locally.
+                doc.db_set("custom_teams_meeting_url", "")
+                frappe.db.delete("Teams Meeting", {"document_type": doctype, "document_name": docname})
+                frappe.db.commit()
+                return {"success": True, "message": "Meeting URL cleared (could not extract meeting ID)."}
+            path = f"me/onlineMeetings/{meeting_id}"
+
+        res = get_client(token).delete(path)
 
         if res.status_code in (200, 204, 404):
             # 404 means: already gone → still clear locally.
             doc.db_set("custom_teams_meeting_url", "")
+            frappe.db.delete("Teams Meeting", {"document_type": doctype, "document_name": docname})
             frappe.db.commit()
             return {
                 "success": True,
@@ -518,14 +1384,14 @@ def reschedule_meeting(docname, doctype, new_start_time=None, new_end_time=None)
             frappe.throw("No Teams meeting found to reschedule.")
             
         token = get_access_token()
-
-        meeting_id = _extract_meeting_id_from_join_url(meeting_url, token)
-        if not meeting_id:
-            frappe.throw("Could not extract meeting ID from URL.")
-
         if not token:
             return {"error": "auth_required", "login_url": get_login_url(docname)}
 
+        series_id = _series_event_id(doctype, docname, meeting_url)
+        meeting_id = None if series_id else _resolve_meeting_id(doctype, docname, meeting_url, token)
+        if not series_id and not meeting_id:
+            frappe.throw("Could not extract meeting ID from URL.")
+
         # Use new_* params or fall back to document fields
         if not new_start_time or not new_end_time:
             start_dt, end_dt = _build_default_times_for_doctype(doc, doctype)
@@ -543,19 +1409,29 @@ def reschedule_meeting(docname, doctype, new_start_time=None, new_end_time=None)
         if start_dt >= end_dt:
             end_dt = start_dt + timedelta(hours=1)
 
-        payload = {
-            "startDateTime": to_utc_isoformat(start_dt),
-            "endDateTime": to_utc_isoformat(end_dt),
-        }
+        if series_id:
+            # Moving the series master moves every occurrence
+            start_utc = datetime.strptime(to_utc_isoformat(start_dt), "%Y-%m-%dT%H:%M:%SZ")
+            end_utc = datetime.strptime(to_utc_isoformat(end_dt), "%Y-%m-%dT%H:%M:%SZ")
+            payload = {
+                "start": {"dateTime": start_utc.isoformat(), "timeZone": "UTC"},
+                "end": {"dateTime": end_utc.isoformat(), "timeZone": "UTC"},
+            }
+            if _is_recurring(doc):
+                payload["recurrence"] = _build_event_recurrence(doc, start_dt, start_utc)
+            path = f"me/events/{series_id}"
+        else:
+            payload = {
+                "startDateTime": to_utc_isoformat(start_dt),
+                "endDateTime": to_utc_isoformat(end_dt),
+            }
+            path = f"me/onlineMeetings/{meeting_id}"
 
-        res = requests.patch(
-            f"{GRAPH_API}/me/onlineMeetings/{meeting_id}",
-            headers=_headers_with_auth(token),
-            json=payload,
-            timeout=30,
-        )
+        res = get_client(token).patch(path, json=payload)
 
         if res.status_code in (200, 204):
+            _invalidate_meeting_snapshot(doctype, docname)
+            frappe.db.commit()
             return {"success": True, "message": "Meeting rescheduled successfully."}
 
         if res.status_code == 401:
@@ -591,25 +1467,15 @@ def get_meeting_attendees(docname, doctype):
         if not meeting_url:
             return {"attendees": [], "message": "No meeting found."}
         
-        token = get_access_token()
-
-        meeting_id = _extract_meeting_id_from_join_url(meeting_url, token)
-        if not meeting_id:
-            return {"attendees": [], "message": "Could not extract meeting ID."}
-
-        if not token:
+        snapshot, error = _get_meeting_snapshot(doctype, docname, meeting_url, get_access_token())
+        if error == "auth_required":
             return {"attendees": [], "message": "Authentication required."}
+        if error == "not_found":
+            return {"attendees": [], "message": "Could not extract meeting ID."}
+        if error:
+            return {"attendees": [], "message": f"Failed to fetch attendees: {error}"}
 
-        res = requests.get(
-            f"{GRAPH_API}/me/onlineMeetings/{meeting_id}",
-            headers=_headers_with_auth(token, json_content=False),
-            timeout=30,
-        )
-        if res.status_code != 200:
-            return {"attendees": [], "message": f"Failed to fetch attendees: {res.status_code}"}
-
-        data = res.json() or {}
-        attendees = data.get("participants", {}).get("attendees", []) or []
+        attendees = snapshot["attendees"]
 
         out = []
         for a in attendees:
@@ -0,0 +1,215 @@
+import gzip
+import json
+import os
+import time
+
+import frappe
+from frappe.utils import add_days, cint, now_datetime
+
+from erpnext_teams_integration.erpnext_teams_integration.doctype.teams_chat_activity.teams_chat_activity import (
+    refresh_chat_activity,
+)
+
+from .export import EXPORT_FIELDS
+from .helpers import get_settings
+
+# Each batch is read from a (created_at, name) keyset cursor and deleted by
+# primary key in its own transaction, with a short pause in between so
+# replication and other writers keep up
+DEFAULT_RETENTION_BATCH_SIZE = 1000
+RETENTION_BATCH_PAUSE = 0.5
+RETENTION_LOCK_KEY = "teams_message_retention"
+RETENTION_LOCK_TIMEOUT = 6 * 3600
+ARCHIVE_DIR = ("private", "teams_archive")
+CLEANUP_COMPLETE_EVENT = "teams_message_cleanup_complete"
+
+
+def apply_retention():
+    """Daily job; applies the retention rules in Teams Settings if enabled"""
+    settings = get_settings()
+    if not cint(settings.retention_enabled):
+        return
+
+    try:
+        run_retention(
+            build_retention_policies(settings),
+            batch_size=cint(settings.retention_batch_size) or DEFAULT_RETENTION_BATCH_SIZE,
+            archive=cint(settings.archive_before_delete)
+        )
+    except Exception as e:
+        frappe.log_error(f"Message retention failed: {str(e)}", "Teams Cleanup Error")
+
+
+def build_retention_policies(settings):
+    """
+    Turn the rules into non-overlapping (label, where clause, values, days) policies.
+
+    A chat rule wins over a Document Type rule, which wins over the default.
+    Policies with 0 days keep messages forever and are dropped here, but they
+    still shield their messages from the broader policies.
+    """
+    chat_days = {}
+    doctype_days = {}
+    for rule in settings.get("retention_rules") or []:
+        if rule.chat_id:
+            chat_days[rule.chat_id] = cint(rule.retention_days)
+        elif rule.document_type:
+            doctype_days[rule.document_type] = cint(rule.retention_days)
+
+    policies = []
+    for chat_id, days in chat_days.items():
+        policies.append((f"chat {chat_id}", "chat_id = %(chat_id)s", {"chat_id": chat_id}, days))
+
+    not_chat_rule = "chat_id NOT IN %(rule_chats)s" if chat_days else "1=1"
+    rule_chats = tuple(chat_days) or ("",)
+    for doctype, days in doctype_days.items():
+        policies.append((
+            f"doctype {doctype}",
+            f"document_type = %(document_type)s AND {not_chat_rule}",
+            {"document_type": doctype, "rule_chats": rule_chats},
+            days
+        ))
+
+    not_doctype_rule = (
+        "(document_type IS NULL OR document_type NOT IN %(rule_doctypes)s)" if doctype_days else "1=1"
+    )
+    policies.append((
+        "default",
+        f"{not_doctype_rule} AND {not_chat_rule}",
+        {"rule_doctypes": tuple(doctype_days) or ("",), "rule_chats": rule_chats},
+        cint(settings.default_retention_days)
+    ))
+
+    return [policy for policy in policies if policy[3] > 0]
+
+
+def run_retention(policies, batch_size=DEFAULT_RETENTION_BATCH_SIZE, archive=False):
+    """
+    Delete messages older than each policy's cutoff in bounded batches.
+
+    Each batch selects the next matching primary keys after the previous
+    batch's last (created_at, name), optionally appends those rows to the
+    archive file, deletes them by key, refreshes the affected activity
+    buckets and commits. Returns the number deleted, or
+    None if another run holds the lock and nothing was done.
+    """
+    lock = frappe.cache().lock(frappe.cache().make_key(RETENTION_LOCK_KEY), timeout=RETENTION_LOCK_TIMEOUT)
+    if not lock.acquire(blocking=False):
+        frappe.logger("erpnext_teams_integration").info("Teams retention skipped: another run is in progress")
+        return None
+
+    archive_file = None
+    deleted = 0
+    try:
+        if archive:
+            archive_file = _open_archive()
+
+        for label, condition, values, days in policies:
+            values = {**values, "cutoff": add_days(now_datetime(), -days), "limit": batch_size}
+            count = _delete_in_batches(condition, values, archive_file)
+            if count:
+                frappe.logger("erpnext_teams_integration").info(
+                    f"Teams retention ({label}, {days} days): deleted {count} messages"
+                )
+            deleted += count
+    finally:
+        if archive_file:
+            archive_file.close()
+        try:
+            lock.release()
+        except Exception:
+            # The lock expired during a long run; the deletions still stand
+            frappe.logger("erpnext_teams_integration").warning(
+                f"Teams retention lock expired before release ({deleted} messages deleted)"
+            )
+
+    return deleted
+
+
+def _delete_in_batches(condition, values, archive_file=None):
+    columns = ", ".join(f"`{field}`" for field in (EXPORT_FIELDS if archive_file else ("name", "chat_id", "created_at")))
+    deleted = 0
+    values = dict(values)
+    cursor = None
+
+    while True:
+        # Resume after the last deleted key; rows the policy keeps (other
+        # rules' chats or doctypes) are never walked again
+        if cursor:
+            values.update(after_created_at=cursor[0], after_name=cursor[1])
+            keyset = (
+                "(created_at > %(after_created_at)s"
+                " OR (created_at = %(after_created_at)s AND name > %(after_name)s))"
+            )
+        else:
+            keyset = "1=1"
+
+        rows = frappe.db.sql(
+            f"""
+            SELECT {columns} FROM `tabTeams Chat Message`
+            WHERE created_at < %(cutoff)s AND {keyset} AND {condition}
+            ORDER BY created_at, name
+            LIMIT %(limit)s
+            """,
+            values,
+            as_dict=True
+        )
+        if not rows:
+            return deleted
+
+        if archive_file:
+            for row in rows:
+                archive_file.write(json.dumps(row, default=str, ensure_ascii=False))
+                archive_file.write("\n")
+            # The archive must hold the rows before they are gone
+            archive_file.flush()
+
+        frappe.db.sql(
+            "DELETE FROM `tabTeams Chat Message` WHERE name IN %(names)s",
+            {"names": tuple(row.name for row in rows)}
+        )
+        refresh_chat_activity({(row.chat_id, row.created_at) for row in rows if row.created_at})
+        frappe.db.commit()
+
+        deleted += len(rows)
+        if len(rows) < values["limit"]:
+            return deleted
+        cursor = (rows[-1].created_at, rows[-1].name)
+
+        time.sleep(RETENTION_BATCH_PAUSE)
+
+
+def _open_archive():
+    directory = frappe.get_site_path(*ARCHIVE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    stamp = now_datetime().strftime("%Y%m%d%H%M%S")
+    return gzip.open(os.path.join(directory, f"teams_messages_{stamp}.ndjson.gz"), "at", encoding="utf-8")
+
+
+def cleanup_messages_older_than(days, user=None):
+    """
+    Background job behind cleanup_old_messages: one policy covering every
+    chat. The outcome is sent to the requesting user as
+    `teams_message_cleanup_complete`.
+    """
+    settings = get_settings()
+    try:
+        deleted = run_retention(
+            [(f"older than {days} days", "1=1", {}, cint(days))],
+            batch_size=cint(settings.retention_batch_size) or DEFAULT_RETENTION_BATCH_SIZE,
+            archive=cint(settings.archive_before_delete)
+        )
+    except Exception as e:
+        frappe.log_error(f"Message cleanup failed: {str(e)}", "Teams Cleanup Error")
+        frappe.publish_realtime(CLEANUP_COMPLETE_EVENT, {"success": False, "error": str(e)}, user=user)
+        raise
+
+    if deleted is None:
+        frappe.publish_realtime(CLEANUP_COMPLETE_EVENT, {
+            "success": False,
+            "error": "Another retention run is in progress, try again once it has finished"
+        }, user=user)
+    else:
+        frappe.publish_realtime(CLEANUP_COMPLETE_EVENT, {"success": True, "deleted": deleted}, user=user)
+
+    return deleted
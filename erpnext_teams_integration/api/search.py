@@ -0,0 +1,127 @@
+import re
+
+import frappe
+from frappe import _
+from frappe.utils import add_days, cint, getdate
+
+# Result pages for the compliance search
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+
+FULLTEXT_INDEX = "ft_teams_chat_message_body_text"
+
+# A quoted phrase or a bare term, each with an optional leading operator
+QUERY_TOKEN = re.compile(r'([+\-~<>]*)(?:"([^"]*)"?|(\S+))')
+
+
+def ensure_fulltext_index():
+    """Create the FULLTEXT index on body_text if it is missing (called from on_doctype_update)"""
+    if frappe.db.db_type != "mariadb":
+        return
+    
+    exists = frappe.db.sql(
+        "SHOW INDEX FROM `tabTeams Chat Message` WHERE Key_name = %s", FULLTEXT_INDEX
+    )
+    if not exists:
+        frappe.db.sql_ddl(
+            f"ALTER TABLE `tabTeams Chat Message` ADD FULLTEXT INDEX `{FULLTEXT_INDEX}` (`body_text`)"
+        )
+
+
+@frappe.whitelist()
+def search_messages(query, chat_id=None, document_type=None, document_name=None, sender=None,
+                    from_date=None, to_date=None, page=1, page_length=SEARCH_PAGE_SIZE):
+    """
+    Ranked full-text search over stored Teams messages.
+    
+    `query` uses MariaDB boolean mode syntax, so plain words match any of
+    them while `+word`, `-word` and `"a phrase"` narrow the result. Input
+    that is not valid boolean syntax is cleaned up by boolean_query. Results
+    are ordered by relevance, then newest first. `sender` matches either
+    the Azure ID or the display name; the date range is inclusive.
+    """
+    frappe.has_permission("Teams Chat Message", "read", throw=True)
+    
+    page = max(cint(page), 1)
+    page_length = min(max(cint(page_length), 1), SEARCH_MAX_PAGE_SIZE)
+    result = {"results": [], "page": page, "page_length": page_length, "has_more": False}
+    
+    query = boolean_query(query)
+    if not query:
+        return result
+    
+    conditions = ["MATCH(`body_text`) AGAINST (%(query)s IN BOOLEAN MODE)", "`is_deleted` = 0"]
+    values = {"query": query}
+    
+    for field, value in (
+        ("chat_id", chat_id),
+        ("document_type", document_type),
+        ("document_name", document_name),
+    ):
+        if value:
+            conditions.append(f"`{field}` = %({field})s")
+            values[field] = value
+    
+    if sender:
+        conditions.append("(`sender_id` = %(sender)s OR `sender_display` = %(sender)s)")
+        values["sender"] = sender
+    if from_date:
+        conditions.append("`created_at` >= %(from_date)s")
+        values["from_date"] = getdate(from_date)
+    if to_date:
+        conditions.append("`created_at` < %(to_date)s")
+        values["to_date"] = add_days(getdate(to_date), 1)
+    
+    values["limit"] = page_length + 1
+    values["offset"] = (page - 1) * page_length
+    
+    try:
+        rows = frappe.db.sql(
+            f"""
+            SELECT `name`, `message_id`, `chat_id`, `sender_id`, `sender_display`, `preview`,
+                `created_at`, `direction`, `document_type`, `document_name`,
+                MATCH(`body_text`) AGAINST (%(query)s IN BOOLEAN MODE) AS `score`
+            FROM `tabTeams Chat Message`
+            WHERE {" AND ".join(conditions)}
+            ORDER BY `score` DESC, `created_at` DESC
+            LIMIT %(limit)s OFFSET %(offset)s
+            """,
+            values,
+            as_dict=True,
+        )
+    except Exception as e:
+        if not frappe.db.is_syntax_error(e):
+            raise
+        frappe.throw(_("Invalid search syntax: {0}").format(query))
+    
+    result["has_more"] = len(rows) > page_length
+    for row in rows[:page_length]:
+        row.created_at = str(row.created_at) if row.created_at else None
+        row.score = float(row.score or 0)
+        result["results"].append(row)
+    
+    return result
+
+
+def boolean_query(query):
+    """
+    Rewrite free text into a query InnoDB accepts in boolean mode.
+
+    Terms keep one leading `+`, `-`, `~`, `<` or `>` and a trailing `*`.
+    Anything else that is not a word character (`@`, `.`, brackets, stray
+    operators) splits the term, and a split term becomes a phrase, so
+    `john.doe@example.com` searches for "john doe example com". Operators
+    with nothing after them are dropped. Returns "" if no term is left.
+    """
+    terms = []
+    for operators, phrase, word in QUERY_TOKEN.findall(query or ""):
+        operator = operators[-1:]
+        quoted = not word
+        words = re.findall(r"\w+", phrase if quoted else word)
+        if not words:
+            continue
+        if quoted or len(words) > 1:
+            terms.append(f'{operator}"{" ".join(words)}"')
+        else:
+            terms.append(f"{operator}{words[0]}{'*' if word.endswith('*') else ''}")
+    return " ".join(terms)
@@ -1,9 +1,10 @@
 import frappe
-import requests
 from frappe import _
-from .helpers import get_access_token, get_settings
+from .helpers import UNKNOWN_USERS_CACHE_KEY, get_access_token, get_settings
+from .graph_client import get_client
+from .export import PARQUET_EXPORT_JOB_ID, get_export_format
 import json
-from frappe.utils import cstr
+from frappe.utils import cint, cstr
 
 
 @frappe.whitelist()
@@ -35,14 +36,14 @@ def bulk_sync_azure_ids():
         if not token:
             frappe.throw('Please authenticate with Microsoft Teams first.')
         
-        headers = {'Authorization': f'Bearer {token}'}
+        client = get_client(token)
         
         # Fetch all users from Microsoft Graph API with pagination
         all_users = []
-        url = 'https://graph.microsoft.com/v1.0/users'
+        url = 'users'
         
         while url:
-            response = requests.get(url, headers=headers, timeout=30)
+            response = client.get(url)
             
             if response.status_code != 200:
                 frappe.log_error(f"Failed to fetch users from Graph API: {response.text}", "Teams Bulk Sync Error")
@@ -109,10 +110,13 @@ def bulk_sync_azure_ids():
         
         frappe.db.commit()
         
+        # Freshly synced users should be looked up again on demand
+        frappe.cache().delete_value(UNKNOWN_USERS_CACHE_KEY)
+        
         # Update settings with owner info if not set
         if not settings.azure_owner_email_id and settings.access_token:
             try:
-                me_response = requests.get('https://graph.microsoft.com/v1.0/me', headers=headers, timeout=30)
+                me_response = client.get('me')
                 if me_response.status_code == 200:
                     me_data = me_response.json()
                     owner_email = me_data.get('mail') or me_data.get('userPrincipalName')
@@ -150,19 +154,16 @@ def test_teams_connection():
                 "message": "No access token available. Please authenticate first."
             }
 
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
+        client = get_client(token)
 
         # Test basic API access
-        me_response = requests.get("https://graph.microsoft.com/v1.0/me", headers=headers, timeout=30)
+        me_response = client.get("me")
 
         if me_response.status_code == 200:
             user_data = me_response.json()
 
             # Test chats access
-            chats_response = requests.get("https://graph.microsoft.com/v1.0/chats?$top=1", headers=headers, timeout=30)
+            chats_response = client.get("chats?$top=1")
             chats_access = chats_response.status_code in (200, 204)
 
             # Test meetings access by creating a dummy meeting
@@ -173,12 +174,7 @@ def test_teams_connection():
             }
 
             meetings_access = False
-            meetings_response = requests.post(
-                "https://graph.microsoft.com/v1.0/me/onlineMeetings",
-                headers=headers,
-                json=dummy_meeting,
-                timeout=30
-            )
+            meetings_response = client.post("me/onlineMeetings", json=dummy_meeting)
 
             if meetings_response.status_code == 201:
                 meetings_access = True
@@ -186,11 +182,7 @@ def test_teams_connection():
                 meeting_id = meetings_response.json().get("id")
                 if meeting_id:
                     try:
-                        requests.delete(
-                            f"https://graph.microsoft.com/v1.0/me/onlineMeetings/{meeting_id}",
-                            headers=headers,
-                            timeout=30
-                        )
+                        client.delete(f"me/onlineMeetings/{meeting_id}")
                     except Exception:
                         pass  # safe ignore cleanup error
 
@@ -223,23 +215,30 @@ def test_teams_connection():
 
 @frappe.whitelist()
 def get_teams_statistics():
-    """Get statistics about Teams integration usage"""
+    """Get statistics about Teams integration usage from the activity rollup"""
     try:
+        totals = frappe.db.sql("""
+            SELECT direction, SUM(message_count) AS message_count
+            FROM `tabTeams Chat Activity`
+            GROUP BY direction
+        """, as_dict=True)
+        by_direction = {row.direction: int(row.message_count or 0) for row in totals}
+        
         stats = {
             "total_conversations": frappe.db.count("Teams Conversation"),
-            "total_messages": frappe.db.count("Teams Chat Message"),
-            "inbound_messages": frappe.db.count("Teams Chat Message", {"direction": "Inbound"}),
-            "outbound_messages": frappe.db.count("Teams Chat Message", {"direction": "Outbound"}),
-            "unique_chats": frappe.db.sql("SELECT COUNT(DISTINCT chat_id) FROM `tabTeams Chat Message`")[0][0],
+            "total_messages": sum(by_direction.values()),
+            "inbound_messages": by_direction.get("Inbound", 0),
+            "outbound_messages": by_direction.get("Outbound", 0),
+            "unique_chats": frappe.db.sql("SELECT COUNT(DISTINCT chat_id) FROM `tabTeams Chat Activity`")[0][0],
             "users_with_azure_id": frappe.db.count("User", {"azure_object_id": ["!=", ""]})
         }
         
         # Get recent activity (last 7 days)
         recent_messages = frappe.db.sql("""
-            SELECT DATE(created_at) as date, COUNT(*) as count 
-            FROM `tabTeams Chat Message` 
-            WHERE created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-            GROUP BY DATE(created_at)
+            SELECT activity_date as date, SUM(message_count) as count
+            FROM `tabTeams Chat Activity`
+            WHERE activity_date >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)
+            GROUP BY activity_date
             ORDER BY date DESC
         """, as_dict=True)
         
@@ -247,9 +246,9 @@ def get_teams_statistics():
         
         # Get top active chats
         top_chats = frappe.db.sql("""
-            SELECT chat_id, COUNT(*) as message_count,
-                   MAX(created_at) as last_activity
-            FROM `tabTeams Chat Message`
+            SELECT chat_id, SUM(message_count) as message_count,
+                   MAX(last_activity) as last_activity
+            FROM `tabTeams Chat Activity`
             GROUP BY chat_id
             ORDER BY message_count DESC
             LIMIT 5
@@ -264,24 +263,45 @@ def get_teams_statistics():
         return {}
 
 
+@frappe.whitelist()
+def rebuild_chat_activity(chat_id=None):
+    """Queue a full recount of the Teams Chat Activity rollup"""
+    frappe.only_for("System Manager")
+    
+    frappe.enqueue(
+        "erpnext_teams_integration.erpnext_teams_integration.doctype.teams_chat_activity.teams_chat_activity.rebuild_chat_activity",
+        queue="long",
+        timeout=3600,
+        job_id=f"teams_chat_activity_rebuild::{chat_id or 'all'}",
+        deduplicate=True,
+        chat_id=chat_id
+    )
+    
+    return {"success": True, "message": _("Statistics rebuild queued")}
+
+
 @frappe.whitelist()
 def cleanup_old_messages(days=30):
-    """Clean up old Teams messages to save space"""
+    """Queue a batched deletion of Teams messages older than `days`"""
+    frappe.only_for("System Manager")
+    
+    # Arrives as a string from the JS client
+    days = cint(days)
+    if days < 1:
+        frappe.throw("Days must be a positive integer")
+    
     try:
-        if not isinstance(days, int) or days < 1:
-            frappe.throw("Days must be a positive integer")
-        
-        # Delete messages older than specified days
-        result = frappe.db.sql("""
-            DELETE FROM `tabTeams Chat Message` 
-            WHERE created_at < DATE_SUB(NOW(), INTERVAL %s DAY)
-        """, (days,))
-        
-        deleted_count = result[0] if result else 0
-        
-        frappe.db.commit()
+        frappe.enqueue(
+            "erpnext_teams_integration.api.retention.cleanup_messages_older_than",
+            queue="long",
+            timeout=6 * 3600,
+            job_id=f"teams_message_cleanup::{days}",
+            deduplicate=True,
+            days=days,
+            user=frappe.session.user
+        )
         
-        message = f"Deleted {deleted_count} messages older than {days} days"
+        message = f"Deletion of messages older than {days} days has been queued"
         frappe.msgprint(message)
         return message
         
@@ -291,46 +311,58 @@ def cleanup_old_messages(days=30):
 
 
 @frappe.whitelist()
-def export_chat_history(chat_id=None, format="json"):
-    """Export chat history for backup or analysis"""
+def export_chat_history(chat_id=None, format="ndjson"):
+    """
+    Queue a streaming export of chat history for backup or analysis.
+    
+    The job writes a gzip-compressed NDJSON or CSV file to private files,
+    reports progress while it runs and fires `teams_chat_export_complete`
+    with the file URL when done.
+    """
+    frappe.has_permission("Teams Chat Message", "export", throw=True)
+    
     try:
-        filters = {}
-        if chat_id:
-            filters["chat_id"] = chat_id
-        
-        messages = frappe.get_all(
-            "Teams Chat Message",
-            filters=filters,
-            fields=["*"],
-            order_by="created_at asc"
+        format = get_export_format(format)
+        user = frappe.session.user
+        
+        frappe.enqueue(
+            "erpnext_teams_integration.api.export.run_chat_export",
+            queue="long",
+            timeout=6 * 3600,
+            job_id=f"teams_chat_export::{user}::{chat_id or 'all'}::{format}",
+            deduplicate=True,
+            chat_id=chat_id,
+            format=format,
+            user=user
         )
         
-        if format.lower() == "csv":
-            import csv
-            import io
-            
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=messages[0].keys() if messages else [])
-            writer.writeheader()
-            writer.writerows(messages)
-            
-            return {
-                "data": output.getvalue(),
-                "filename": f"teams_chat_export_{chat_id or 'all'}_{frappe.utils.now()}.csv",
-                "content_type": "text/csv"
-            }
-        else:
-            return {
-                "data": json.dumps(messages, indent=2, default=str),
-                "filename": f"teams_chat_export_{chat_id or 'all'}_{frappe.utils.now()}.json",
-                "content_type": "application/json"
-            }
-            
+        return {
+            "success": True,
+            "message": _("Export started. You will be notified when the file is ready.")
+        }
+        
     except Exception as e:
         frappe.log_error(f"Error exporting chat history: {str(e)}", "Teams Export Error")
         frappe.throw(f"Failed to export chat history: {str(e)}")
 
 
+@frappe.whitelist()
+def export_chat_analytics(full=0):
+    """Queue a Parquet export of messages changed since the last run (all of them if `full`)"""
+    frappe.only_for("System Manager")
+    
+    frappe.enqueue(
+        "erpnext_teams_integration.api.export.run_parquet_export",
+        queue="long",
+        timeout=6 * 3600,
+        job_id=PARQUET_EXPORT_JOB_ID,
+        deduplicate=True,
+        full=cint(full)
+    )
+    
+    return {"success": True, "message": _("Parquet export queued")}
+
+
 @frappe.whitelist()
 def validate_configuration():
     """Validate Teams integration configuration"""
@@ -370,8 +402,7 @@ def validate_configuration():
         else:
             # Test token validity
             try:
-                headers = {'Authorization': f'Bearer {token}'}
-                response = requests.get('https://graph.microsoft.com/v1.0/me', headers=headers, timeout=10)
+                response = get_client(token).get('me')
                 if response.status_code != 200:
                     issues.append("Access token appears to be invalid")
             except:
@@ -439,6 +470,7 @@ def get_oauth_scopes():
         "User.Read",
         "User.ReadBasic.All", 
         "OnlineMeetings.ReadWrite",
+        "Calendars.ReadWrite",
         "offline_access",
         "Chat.ReadWrite",
         "Chat.Create",
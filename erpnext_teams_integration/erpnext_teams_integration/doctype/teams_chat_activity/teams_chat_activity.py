@@ -0,0 +1,185 @@
+# Copyright (c) 2026, Yanky and contributors
+# For license information, please see license.txt
+
+import hashlib
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, getdate, now_datetime
+
+ACTIVITY_INSERT_FIELDS = (
+	"name",
+	"creation",
+	"modified",
+	"owner",
+	"modified_by",
+	"chat_id",
+	"activity_date",
+	"direction",
+	"message_count",
+	"last_activity",
+)
+
+ACTIVITY_LOCK_KEY = "teams_chat_activity"
+ACTIVITY_LOCK_TIMEOUT = 300
+ACTIVITY_LOCK_WAIT = 30
+
+
+class TeamsChatActivity(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Teams Chat Activity", ["chat_id", "activity_date"])
+
+
+def activity_name(chat_id, activity_date, direction):
+	"""Rows are named after their bucket, so a refresh always rewrites the same row"""
+	key = f"{chat_id}|{getdate(activity_date)}|{direction}"
+	return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+
+def refresh_chat_activity(buckets):
+	"""
+	Recount the given (chat_id, date) buckets from Teams Chat Message once
+	the current transaction commits.
+
+	Only the distinct affected days are recounted, each as a range on the
+	(chat_id, created_at) index, so the cost follows the messages in those
+	days, not the table size or the span between them. Counting after the
+	commit, under a per-chat lock, means every recount sees all committed
+	messages and the last one to write is never older than the others.
+	Deleted messages are not counted. Nothing is written on rollback.
+	"""
+	days_by_chat = defaultdict(set)
+	for chat_id, day in buckets or ():
+		if chat_id and day:
+			days_by_chat[chat_id].add(getdate(day))
+
+	for chat_id, days in days_by_chat.items():
+		frappe.db.after_commit.add(partial(_recount_after_commit, chat_id, days))
+
+
+def rebuild_chat_activity(chat_id=None):
+	"""Recount every chat (or one) from scratch, committing per chat"""
+	if chat_id:
+		chat_ids = [chat_id]
+	else:
+		frappe.db.delete("Teams Chat Activity")
+		frappe.db.commit()
+		chat_ids = frappe.db.sql_list("SELECT DISTINCT chat_id FROM `tabTeams Chat Message`")
+
+	for chat in chat_ids:
+		with _chat_lock(chat):
+			_recount(chat)
+			frappe.db.commit()
+
+	return len(chat_ids)
+
+
+def _recount_after_commit(chat_id, days):
+	try:
+		with _chat_lock(chat_id):
+			_recount(chat_id, days)
+			frappe.db.commit()
+	except Exception as e:
+		frappe.db.rollback()
+		frappe.log_error(
+			f"Refreshing chat activity for {chat_id} failed: {e!s}\nUse Rebuild Statistics to recount.",
+			"Teams Chat Activity Error",
+		)
+
+
+@contextmanager
+def _chat_lock(chat_id):
+	"""Serialise recounts of one chat; if the lock cannot be had, count anyway"""
+	cache = frappe.cache()
+	lock = cache.lock(
+		cache.make_key(f"{ACTIVITY_LOCK_KEY}::{chat_id}"),
+		timeout=ACTIVITY_LOCK_TIMEOUT,
+		blocking_timeout=ACTIVITY_LOCK_WAIT,
+	)
+	acquired = lock.acquire()
+	try:
+		yield
+	finally:
+		if acquired:
+			try:
+				lock.release()
+			except Exception:
+				# Expired while counting; the next recount corrects any overlap
+				pass
+
+
+def _recount(chat_id, days=None):
+	"""Upsert the activity rows of a chat for the given days, or all of them"""
+	conditions = ["chat_id = %(chat_id)s", "is_deleted = 0"]
+	values = {"chat_id": chat_id}
+	days = sorted(days or ())
+	if days:
+		ranges = []
+		for i, day in enumerate(days):
+			values[f"from_{i}"] = day
+			values[f"to_{i}"] = add_days(day, 1)
+			ranges.append(f"(created_at >= %(from_{i})s AND created_at < %(to_{i})s)")
+		conditions.append(f"({' OR '.join(ranges)})")
+
+	counts = frappe.db.sql(
+		f"""
+		SELECT DATE(created_at) AS activity_date, direction,
+			COUNT(*) AS message_count, MAX(created_at) AS last_activity
+		FROM `tabTeams Chat Message`
+		WHERE {" AND ".join(conditions)}
+		GROUP BY DATE(created_at), direction
+		""",
+		values,
+		as_dict=True,
+	)
+
+	names = [activity_name(chat_id, row.activity_date, row.direction) for row in counts]
+
+	# Buckets that no longer have any messages
+	stale = {"chat_id": chat_id}
+	if days:
+		stale["activity_date"] = ["in", days]
+	if names:
+		stale["name"] = ["not in", names]
+	frappe.db.delete("Teams Chat Activity", stale)
+
+	if not counts:
+		return
+
+	now = now_datetime()
+	user = frappe.session.user
+	rows = [
+		(
+			name,
+			now,
+			now,
+			user,
+			user,
+			chat_id,
+			row.activity_date,
+			row.direction,
+			row.message_count,
+			row.last_activity,
+		)
+		for name, row in zip(names, counts, strict=True)
+	]
+	columns = ", ".join(f"`{field}`" for field in ACTIVITY_INSERT_FIELDS)
+	row_placeholder = "(" + ", ".join(["%s"] * len(ACTIVITY_INSERT_FIELDS)) + ")"
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tabTeams Chat Activity` ({columns})
+		VALUES {", ".join([row_placeholder] * len(rows))}
+		ON DUPLICATE KEY UPDATE
+			`message_count` = VALUES(`message_count`),
+			`last_activity` = VALUES(`last_activity`),
+			`modified` = VALUES(`modified`),
+			`modified_by` = VALUES(`modified_by`)
+		""",
+		[value for row in rows for value in row],
+	)
@@ -1,9 +1,19 @@
 # Copyright (c) 2025, Yanky and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class TeamsChatMessage(Document):
 	pass
+
+
+def on_doctype_update():
+	# History pages are read per chat in created_at order
+	frappe.db.add_index("Teams Chat Message", ["chat_id", "created_at"])
+
+	# Plaintext search, see erpnext_teams_integration.api.search
+	from erpnext_teams_integration.api.search import ensure_fulltext_index
+
+	ensure_fulltext_index()
@@ -0,0 +1,13 @@
+# Copyright (c) 2026, Yanky and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class TeamsMeeting(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Teams Meeting", ["document_type", "document_name"])
@@ -127,6 +127,49 @@ frappe.ui.form.on('Teams Settings', {
                 );
             }, __('Sync Actions'));
 
+            // Unknown Azure users (negative lookup cache)
+            frm.add_custom_button(__('Unknown Azure Users'), function() {
+                frappe.call({
+                    method: "erpnext_teams_integration.api.helpers.get_unknown_azure_users",
+                    callback: function(r) {
+                        const rows = r.message || [];
+                        let message = __('No unknown users cached.');
+
+                        if (rows.length > 0) {
+                            message = `<table class="table table-bordered table-condensed">
+                                <tr><th>${__('Email')}</th><th>${__('Misses')}</th><th>${__('Last Seen')}</th><th>${__('Skipped')}</th></tr>`;
+                            rows.forEach(row => {
+                                message += `<tr><td>${frappe.utils.escape_html(row.email)}</td><td>${row.misses}</td>
+                                    <td>${row.last_seen}</td><td>${row.active ? '✅' : '❌'}</td></tr>`;
+                            });
+                            message += `</table>`;
+                        }
+
+                        const dialog = frappe.msgprint({
+                            title: __('Unknown Azure Users'),
+                            message: message,
+                            indicator: 'blue',
+                            wide: true,
+                            primary_action: rows.length ? {
+                                label: __('Flush Cache'),
+                                action: function() {
+                                    frappe.call({
+                                        method: "erpnext_teams_integration.api.helpers.clear_unknown_azure_users",
+                                        callback: function() {
+                                            dialog.hide();
+                                            frappe.show_alert({
+                                                message: __('Unknown user cache flushed'),
+                                                indicator: 'green'
+                                            });
+                                        }
+                                    });
+                                }
+                            } : null
+                        });
+                    }
+                });
+            }, __('Sync Actions'));
+
             // Get statistics button
             frm.add_custom_button(__('View Statistics'), function() {
                 frappe.call({
@@ -156,11 +199,29 @@ frappe.ui.form.on('Teams Settings', {
                                 });
                             }
                             
-                            frappe.msgprint({
+                            // Counts come from the Teams Chat Activity rollup
+                            const dialog = frappe.msgprint({
                                 title: __('Teams Integration Statistics'),
                                 message: message,
                                 indicator: 'blue',
-                                wide: true
+                                wide: true,
+                                primary_action: {
+                                    label: __('Rebuild Statistics'),
+                                    action: function() {
+                                        frappe.call({
+                                            method: "erpnext_teams_integration.api.settings.rebuild_chat_activity",
+                                            callback: function(r) {
+                                                dialog.hide();
+                                                if (r.message && r.message.success) {
+                                                    frappe.show_alert({
+                                                        message: r.message.message,
+                                                        indicator: 'green'
+                                                    });
+                                                }
+                                            }
+                                        });
+                                    }
+                                }
                             });
                         }
                     }
@@ -239,24 +300,86 @@ frappe.ui.form.on('Teams Settings', {
                     frappe.confirm(
                         __(`This will permanently delete all Teams messages older than ${values.days} days. Continue?`),
                         function() {
+                            frappe.realtime.off('teams_message_cleanup_complete');
+                            frappe.realtime.on('teams_message_cleanup_complete', function(data) {
+                                frappe.realtime.off('teams_message_cleanup_complete');
+                                if (data.success) {
+                                    frappe.msgprint({
+                                        title: __('Cleanup Complete'),
+                                        message: __('{0} messages deleted', [data.deleted]),
+                                        indicator: 'green'
+                                    });
+                                } else {
+                                    frappe.msgprint({
+                                        title: __('Cleanup Not Run'),
+                                        message: frappe.utils.escape_html(data.error || ''),
+                                        indicator: 'red'
+                                    });
+                                }
+                            });
+
                             frappe.call({
                                 method: "erpnext_teams_integration.api.settings.cleanup_old_messages",
-                                args: { days: values.days },
-                                callback: function(r) {
-                                    if (!r.exc) {
-                                        frappe.msgprint({
-                                            title: __('Cleanup Complete'),
-                                            message: r.message,
-                                            indicator: 'green'
-                                        });
-                                    }
-                                }
+                                args: { days: values.days }
                             });
                         }
                     );
                 }, __('Cleanup Messages'), __('Delete'));
             }, __('More Actions'));
 
+            // Export chat history (runs in the background)
+            frm.add_custom_button(__('Export Chat History'), function() {
+                frappe.prompt([
+                    {
+                        'fieldname': 'chat_id',
+                        'label': __('Chat ID'),
+                        'fieldtype': 'Data',
+                        'description': __('Leave empty to export all chats')
+                    },
+                    {
+                        'fieldname': 'format',
+                        'label': __('Format'),
+                        'fieldtype': 'Select',
+                        'options': 'ndjson\ncsv',
+                        'default': 'ndjson',
+                        'reqd': 1
+                    }
+                ], function(values) {
+                    frappe.realtime.off('teams_chat_export_complete');
+                    frappe.realtime.on('teams_chat_export_complete', function(data) {
+                        frappe.realtime.off('teams_chat_export_complete');
+                        if (data.success) {
+                            frappe.msgprint({
+                                title: __('Export Ready'),
+                                message: __('{0} messages exported: <a href="{1}" target="_blank">{2}</a>',
+                                    [data.rows, data.file_url, frappe.utils.escape_html(data.file_name)]),
+                                indicator: 'green'
+                            });
+                            frm.reload_doc();
+                        } else {
+                            frappe.msgprint({
+                                title: __('Export Failed'),
+                                message: frappe.utils.escape_html(data.error || ''),
+                                indicator: 'red'
+                            });
+                        }
+                    });
+
+                    frappe.call({
+                        method: "erpnext_teams_integration.api.settings.export_chat_history",
+                        args: values,
+                        callback: function(r) {
+                            if (r.message && r.message.success) {
+                                frappe.show_alert({
+                                    message: r.message.message,
+                                    indicator: 'blue'
+                                });
+                            }
+                        }
+                    });
+                }, __('Export Chat History'), __('Export'));
+            }, __('More Actions'));
+
             // Show authentication status indicator
             if (frm.doc.access_token) {
                 frm.dashboard.add_indicator(__('Authenticated'), 'green');
@@ -275,6 +398,11 @@ frappe.ui.form.on('Teams Settings', {
                         frm.dashboard.add_indicator(__('Token Expires Soon'), 'yellow');
                     }
                 }
+
+                // Background refresher health
+                if (frm.doc.token_refresh_failures > 0) {
+                    frm.dashboard.add_indicator(__('Token Refresh Failing ({0})', [frm.doc.token_refresh_failures]), 'orange');
+                }
             } else {
                 frm.dashboard.add_indicator(__('Not Authenticated'), 'red');
             }
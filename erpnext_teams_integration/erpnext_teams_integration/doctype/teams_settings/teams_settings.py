@@ -4,6 +4,10 @@
 # import frappe
 from frappe.model.document import Document
 
+from erpnext_teams_integration.api.helpers import clear_token_cache
+
 
 class TeamsSettings(Document):
-	pass
+	def on_update(self):
+		# Tokens may have changed; force the next caller to reload them
+		clear_token_cache()
@@ -50,6 +50,10 @@ doctype_js = {
 }
 
 # doctype_list_js = {"doctype" : "public/js/doctype_list.js"}
+doctype_list_js = {
+    "Project": "public/js/teams_meetings_list.js",
+    "Event": "public/js/teams_meetings_list.js"
+}
 # doctype_tree_js = {"doctype" : "public/js/doctype_tree.js"}
 # doctype_calendar_js = {"doctype" : "public/js/doctype_calendar.js"}
 
@@ -152,6 +156,21 @@ after_install = "erpnext_teams_integration.install.after_install"
 # 	}
 # }
 
+doc_events = {
+    "Event": {
+        "on_update": [
+            "erpnext_teams_integration.api.meetings.on_participants_update",
+            "erpnext_teams_integration.api.meetings.on_schedule_update"
+        ]
+    },
+    "Project": {
+        "on_update": [
+            "erpnext_teams_integration.api.meetings.on_participants_update",
+            "erpnext_teams_integration.api.meetings.on_schedule_update"
+        ]
+    }
+}
+
 # Scheduled Tasks
 # ---------------
 
@@ -174,9 +193,21 @@ after_install = "erpnext_teams_integration.install.after_install"
 # }
 
 scheduler_events = {
-       "hourly": [
+       "hourly_long": [
            "erpnext_teams_integration.api.chat.sync_all_conversations"
-       ]
+       ],
+       "daily_long": [
+           "erpnext_teams_integration.api.export.scheduled_parquet_export",
+           "erpnext_teams_integration.api.retention.apply_retention"
+       ],
+       "cron": {
+           "*/5 * * * *": [
+               "erpnext_teams_integration.tasks.refresh_token_if_expiring"
+           ],
+           "* * * * *": [
+               "erpnext_teams_integration.api.meetings.sync_due_meeting_attendees"
+           ]
+       }
    }
 
 # Testing
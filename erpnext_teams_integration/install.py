@@ -149,19 +149,9 @@ def ensure_doctype_permissions(doctype, permissions):
 def create_database_indexes():
     """Create database indexes for better performance"""
     try:
-        # Index on Teams Chat Message for faster queries
+        # Teams Chat Message's unique message_id and (chat_id, created_at)
+        # indexes are declared on the DocType itself
         indexes = [
-            {
-                "table": "tabTeams Chat Message",
-                "columns": ["chat_id", "created_at"],
-                "name": "idx_teams_chat_message_chat_created"
-            },
-            {
-                "table": "tabTeams Chat Message",
-                "columns": ["message_id"],
-                "name": "idx_teams_chat_message_id",
-                "unique": True
-            },
             {
                 "table": "tabTeams Chat Message",
                 "columns": ["direction", "created_at"],
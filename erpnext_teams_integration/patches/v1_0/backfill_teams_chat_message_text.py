@@ -0,0 +1,35 @@
+import frappe
+
+from erpnext_teams_integration.api.chat import _message_plaintext, _message_preview
+
+BATCH_SIZE = 1000
+
+
+def execute():
+	"""Derive body_text and preview for messages stored before the columns existed"""
+	last_name = ""
+	while True:
+		rows = frappe.db.sql(
+			"""
+			SELECT name, body FROM `tabTeams Chat Message`
+			WHERE body_text IS NULL AND name > %s
+			ORDER BY name
+			LIMIT %s
+			""",
+			(last_name, BATCH_SIZE),
+			as_dict=True,
+		)
+		if not rows:
+			break
+
+		for row in rows:
+			body_text = _message_plaintext(row.body)
+			frappe.db.set_value(
+				"Teams Chat Message",
+				row.name,
+				{"body_text": body_text, "preview": _message_preview(body_text)},
+				update_modified=False,
+			)
+
+		frappe.db.commit()
+		last_name = rows[-1].name
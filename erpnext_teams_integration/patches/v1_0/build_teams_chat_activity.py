@@ -0,0 +1,16 @@
+import frappe
+
+
+def execute():
+	"""Fill the activity rollup for messages synced before it existed"""
+	if not frappe.db.count("Teams Chat Message"):
+		return
+
+	# Counting a large message table can outlast a migrate, run it as a job
+	frappe.enqueue(
+		"erpnext_teams_integration.erpnext_teams_integration.doctype.teams_chat_activity.teams_chat_activity.rebuild_chat_activity",
+		queue="long",
+		timeout=3600,
+		job_id="teams_chat_activity_rebuild::all",
+		deduplicate=True,
+	)
@@ -0,0 +1,20 @@
+import frappe
+
+
+def execute():
+	"""Drop duplicate message_id rows so the unique constraint on the DocType can be applied"""
+	if not frappe.db.table_exists("Teams Chat Message"):
+		return
+
+	frappe.db.sql(
+		"""
+		DELETE m FROM `tabTeams Chat Message` m
+		JOIN `tabTeams Chat Message` keep
+			ON keep.message_id = m.message_id AND keep.name < m.name
+		"""
+	)
+
+	# Superseded by the indexes declared on the DocType
+	for index in ("idx_teams_chat_message_id", "idx_teams_chat_message_chat_created"):
+		if frappe.db.sql("SHOW INDEX FROM `tabTeams Chat Message` WHERE Key_name = %s", index):
+			frappe.db.sql_ddl(f"ALTER TABLE `tabTeams Chat Message` DROP INDEX `{index}`")
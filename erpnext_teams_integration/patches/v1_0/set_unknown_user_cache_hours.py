@@ -0,0 +1,14 @@
+import frappe
+
+from erpnext_teams_integration.api.helpers import DEFAULT_UNKNOWN_USER_CACHE_HOURS
+
+
+def execute():
+	"""Sites that never saved Teams Settings read the new field as 0, which disables the cache"""
+	stored = frappe.db.get_value(
+		"Singles", {"doctype": "Teams Settings", "field": "unknown_user_cache_hours"}, "value"
+	)
+	if stored in (None, ""):
+		frappe.db.set_single_value(
+			"Teams Settings", "unknown_user_cache_hours", DEFAULT_UNKNOWN_USER_CACHE_HOURS
+		)
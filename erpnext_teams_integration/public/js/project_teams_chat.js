@@ -39,34 +39,68 @@ frappe.ui.form.on("Project", {
             }, __("Teams"));
 
             frm.add_custom_button(__('Open Teams Chat'), () => {
-                frappe.call({
-                    method: "erpnext_teams_integration.api.chat.get_local_chat_messages",
-                    args: { chat_id: frm.doc.custom_teams_chat_id },
-                    callback: function(r) {
-                        var messages = r.message || [];
-                        window.teamsChatModal = window.teamsChatModal || (function(){
-                            var w=document.createElement('div');
-                            w.id='teams-chat-modal';
-                            w.style='position:fixed;left:0;top:0;width:100%;height:100%;background:rgba(0,0,0,0.4);display:flex;align-items:center;justify-content:center;z-index:9999;';
-                            var inner=document.createElement('div');
-                            inner.style='background:white;width:80%;max-width:900px;border-radius:8px;padding:16px;max-height:80%;overflow:auto;';
-                            inner.innerHTML='<div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:8px"><h4>Teams Chat</h4><button id="teams-close">Close</button></div><div id="teams-chat-contents"></div>';
-                            w.appendChild(inner);
-                            document.body.appendChild(w);
-                            w.querySelector('#teams-close').addEventListener('click',function(){w.style.display='none'});
-                            return {show:function(){w.style.display='flex'},hide:function(){w.style.display='none'}};
-                        })();
-                        var container = document.getElementById('teams-chat-contents');
-                        container.innerHTML='';
-                        messages.forEach(function(m){
-                            var el=document.createElement('div');
-                            el.style='padding:8px;border-bottom:1px solid #eee';
-                            el.innerHTML = '<b>'+(m.sender_display||m.sender_id)+'</b> <small style="color:#666">'+(m.created_at||'')+'</small><div style="margin-top:6px">'+m.body+'</div>';
-                            container.appendChild(el);
-                        });
-                        window.teamsChatModal.show();
-                    }
-                });
+                window.teamsChatModal = window.teamsChatModal || (function(){
+                    var w=document.createElement('div');
+                    w.id='teams-chat-modal';
+                    w.style='position:fixed;left:0;top:0;width:100%;height:100%;background:rgba(0,0,0,0.4);display:flex;align-items:center;justify-content:center;z-index:9999;';
+                    var inner=document.createElement('div');
+                    inner.style='background:white;width:80%;max-width:900px;border-radius:8px;padding:16px;max-height:80%;overflow:auto;';
+                    inner.innerHTML='<div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:8px"><h4>Teams Chat</h4><button id="teams-close">Close</button></div><div id="teams-chat-contents"></div>';
+                    w.appendChild(inner);
+                    document.body.appendChild(w);
+                    w.querySelector('#teams-close').addEventListener('click',function(){w.style.display='none'});
+                    return {show:function(){w.style.display='flex'},hide:function(){w.style.display='none'},scroller:inner};
+                })();
+                var modal = window.teamsChatModal;
+                var container = document.getElementById('teams-chat-contents');
+                container.innerHTML='';
+
+                // Older pages are fetched by cursor as the user scrolls up
+                var state = { chat_id: frm.doc.custom_teams_chat_id, before: null, has_more: true, loading: false };
+                modal.state = state;
+
+                var load_older = function(initial) {
+                    if (state.loading || !state.has_more) return;
+                    state.loading = true;
+                    var fill_more = false;
+                    var args = { chat_id: state.chat_id };
+                    if (state.before) args.before = state.before;
+                    frappe.call({
+                        method: "erpnext_teams_integration.api.chat.get_chat_history",
+                        args: args,
+                        callback: function(r) {
+                            if (modal.state !== state) return; // reopened for another document
+                            var page = r.message || {};
+                            var fragment = document.createDocumentFragment();
+                            (page.messages || []).forEach(function(m){
+                                var el=document.createElement('div');
+                                el.style='padding:8px;border-bottom:1px solid #eee';
+                                el.innerHTML = '<b>'+(m.sender_display||m.sender_id)+'</b> <small style="color:#666">'+(m.created_at||'')+'</small><div style="margin-top:6px">'+m.body+'</div>';
+                                fragment.appendChild(el);
+                            });
+                            var previous_height = modal.scroller.scrollHeight;
+                            container.insertBefore(fragment, container.firstChild);
+                            state.before = page.before;
+                            state.has_more = !!page.has_more;
+                            // Keep the view anchored on the message the user was reading
+                            modal.scroller.scrollTop = initial
+                                ? modal.scroller.scrollHeight
+                                : modal.scroller.scrollTop + modal.scroller.scrollHeight - previous_height;
+                            // A short page cannot be scrolled, so keep loading until it can
+                            fill_more = state.has_more && modal.scroller.scrollHeight <= modal.scroller.clientHeight;
+                        },
+                        always: function() {
+                            state.loading = false;
+                            if (fill_more) load_older(initial);
+                        }
+                    });
+                };
+
+                modal.scroller.onscroll = function() {
+                    if (modal.scroller.scrollTop < 50) load_older(false);
+                };
+                modal.show();
+                load_older(true);
             }, __("Teams"));
 
             frm.add_custom_button(__('Send Teams Message'), () => {
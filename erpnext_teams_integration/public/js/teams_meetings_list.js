@@ -0,0 +1,54 @@
+// Bulk "Create Teams Meetings" action for Event and Project list views
+(function() {
+    const setup = function(listview) {
+        listview.page.add_actions_menu_item(__('Create Teams Meetings'), function() {
+            const docnames = listview.get_checked_items(true);
+            if (!docnames.length) {
+                frappe.msgprint(__('Select at least one document.'));
+                return;
+            }
+
+            frappe.realtime.off('teams_bulk_meetings_complete');
+            frappe.realtime.on('teams_bulk_meetings_complete', function(data) {
+                frappe.realtime.off('teams_bulk_meetings_complete');
+                const results = data.results || {};
+                let message = `<table class="table table-bordered table-condensed">
+                    <tr><th>${__('Document')}</th><th>${__('Result')}</th></tr>`;
+                Object.keys(results).forEach(name => {
+                    const row = results[name];
+                    const detail = row.status === 'created'
+                        ? `<a href="${row.meeting_url}" target="_blank">${__('Join link')}</a>`
+                        : frappe.utils.escape_html(row.message || '');
+                    message += `<tr><td>${frappe.utils.escape_html(name)}</td><td>${row.status}: ${detail}</td></tr>`;
+                });
+                message += `</table>`;
+                frappe.msgprint({ title: __('Teams Meetings'), message: message, wide: true });
+                listview.refresh();
+            });
+
+            frappe.call({
+                method: "erpnext_teams_integration.api.meetings.create_meetings_bulk",
+                args: { doctype: listview.doctype, docnames: docnames },
+                callback: function(r) {
+                    if (r.message && r.message.login_url) {
+                        window.location.href = r.message.login_url;
+                    } else if (r.message && r.message.success) {
+                        frappe.show_alert({ message: r.message.message, indicator: 'blue' });
+                    }
+                }
+            });
+        });
+    };
+
+    ["Event", "Project"].forEach(doctype => {
+        const settings = frappe.listview_settings[doctype] = frappe.listview_settings[doctype] || {};
+        // This file is loaded by both list views; hook each one only once
+        if (settings.teams_bulk_meetings) return;
+        settings.teams_bulk_meetings = true;
+        const existing = settings.onload;
+        settings.onload = function(listview) {
+            if (existing) existing(listview);
+            setup(listview);
+        };
+    });
+})();
@@ -0,0 +1,69 @@
+import time
+
+import frappe
+from frappe.utils import get_datetime, now_datetime
+
+from erpnext_teams_integration.api.helpers import refresh_access_token_single_flight
+
+# Renew once fewer than this many seconds of validity remain. The scheduler
+# runs every 5 minutes, so a token gets a couple of attempts before
+# get_access_token's own 5 minute buffer is reached.
+PROACTIVE_REFRESH_WINDOW = 15 * 60
+TOKEN_REFRESH_JOB_ID = "teams_token_refresh"
+
+
+def refresh_token_if_expiring():
+    """Scheduled job: renew the access token before interactive calls need it"""
+    values = frappe.db.get_value(
+        "Teams Settings",
+        "Teams Settings",
+        ["access_token", "refresh_token", "token_expiry", "token_refresh_failures"],
+        as_dict=True,
+    )
+    if not values or not values.refresh_token:
+        return
+
+    if values.token_expiry:
+        remaining = (get_datetime(values.token_expiry) - now_datetime()).total_seconds()
+        if remaining > PROACTIVE_REFRESH_WINDOW:
+            return
+
+    started = time.monotonic()
+    try:
+        token = refresh_access_token_single_flight(stale_token=values.access_token)
+        if not token:
+            raise Exception("Token endpoint returned no access token")
+    except Exception as e:
+        frappe.db.set_value(
+            "Teams Settings",
+            "Teams Settings",
+            {
+                "token_refresh_failures": (values.token_refresh_failures or 0) + 1,
+                "last_token_refresh_error": str(e)[:1000],
+            },
+        )
+        frappe.db.commit()
+        frappe.log_error(f"Background token refresh failed: {e!s}", "Teams Token Refresh Error")
+        return
+
+    frappe.db.set_value(
+        "Teams Settings",
+        "Teams Settings",
+        {
+            "last_token_refresh": now_datetime(),
+            "token_refresh_latency_ms": int((time.monotonic() - started) * 1000),
+            "token_refresh_failures": 0,
+            "last_token_refresh_error": "",
+        },
+    )
+    frappe.db.commit()
+
+
+def enqueue_token_refresh():
+    """Queue a one-off background refresh; repeated calls collapse into one job"""
+    frappe.enqueue(
+        "erpnext_teams_integration.tasks.refresh_token_if_expiring",
+        queue="short",
+        job_id=TOKEN_REFRESH_JOB_ID,
+        deduplicate=True,
+    )
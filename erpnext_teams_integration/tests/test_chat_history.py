@@ -0,0 +1,104 @@
+# Copyright (c) 2025, Yanky and Contributors
+# See license.txt
+
+from datetime import datetime
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_teams_integration.api.chat import _parse_history_cursor, get_chat_history
+
+CHAT_ID = "19:test-history@thread.v2"
+
+# (name, created_at); the three hist-c-* messages share a timestamp
+MESSAGES = [
+	("hist-1", "2025-01-01 09:00:00"),
+	("hist-2", "2025-01-02 09:00:00"),
+	("hist-c-a", "2025-01-03 09:00:00"),
+	("hist-c-b", "2025-01-03 09:00:00"),
+	("hist-c-c", "2025-01-03 09:00:00"),
+	("hist-4", "2025-01-04 09:00:00"),
+	("hist-5", "2025-01-05 09:00:00"),
+]
+ORDER = [name for name, _ in MESSAGES]
+
+
+def names(page):
+	return [message["name"] for message in page["messages"]]
+
+
+class TestChatHistory(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		frappe.db.delete("Teams Chat Message", {"chat_id": CHAT_ID})
+		for name, created_at in MESSAGES:
+			cls.insert_message(name, created_at)
+		# Deleted messages never show up in history
+		cls.insert_message("hist-deleted", "2025-01-02 12:00:00", is_deleted=1)
+
+	@staticmethod
+	def insert_message(name, created_at, **extra):
+		frappe.get_doc(
+			{
+				"doctype": "Teams Chat Message",
+				"chat_id": CHAT_ID,
+				"message_id": f"msg-{name}",
+				"sender_display": "Test Sender",
+				"body": f"<p>{name}</p>",
+				"created_at": created_at,
+				"direction": "Inbound",
+				**extra,
+			}
+		).insert(ignore_permissions=True, set_name=name)
+
+	def test_latest_page_without_cursor(self):
+		page = get_chat_history(CHAT_ID, limit=3)
+		self.assertEqual(names(page), ["hist-c-c", "hist-4", "hist-5"])
+		self.assertTrue(page["has_more"])
+		self.assertEqual(page["before"], "2025-01-03 09:00:00|hist-c-c")
+		self.assertEqual(page["after"], "2025-01-05 09:00:00|hist-5")
+
+	def test_paging_back_with_before(self):
+		page = get_chat_history(CHAT_ID, limit=3)
+		page = get_chat_history(CHAT_ID, before=page["before"], limit=3)
+		self.assertEqual(names(page), ["hist-2", "hist-c-a", "hist-c-b"])
+		self.assertTrue(page["has_more"])
+
+		page = get_chat_history(CHAT_ID, before=page["before"], limit=3)
+		self.assertEqual(names(page), ["hist-1"])
+		self.assertFalse(page["has_more"])
+
+	def test_ties_on_created_at_are_split_across_pages(self):
+		seen = []
+		page = get_chat_history(CHAT_ID, limit=2)
+		while True:
+			seen = names(page) + seen
+			if not page["has_more"]:
+				break
+			page = get_chat_history(CHAT_ID, before=page["before"], limit=2)
+
+		# Every message exactly once, in (created_at, name) order
+		self.assertEqual(seen, ORDER)
+
+	def test_paging_forward_with_after(self):
+		page = get_chat_history(CHAT_ID, after="2025-01-03 09:00:00|hist-c-a", limit=3)
+		self.assertEqual(names(page), ["hist-c-b", "hist-c-c", "hist-4"])
+		self.assertTrue(page["has_more"])
+
+		page = get_chat_history(CHAT_ID, after=page["after"], limit=3)
+		self.assertEqual(names(page), ["hist-5"])
+		self.assertFalse(page["has_more"])
+
+	def test_malformed_cursor_returns_latest_page(self):
+		latest = names(get_chat_history(CHAT_ID, limit=3))
+		for cursor in ("garbage", "not-a-date|hist-4", "|hist-4", "2025-01-03 09:00:00|"):
+			self.assertEqual(names(get_chat_history(CHAT_ID, before=cursor, limit=3)), latest, cursor)
+
+	def test_parse_history_cursor(self):
+		self.assertEqual(
+			_parse_history_cursor("2025-01-03 09:00:00|hist-c-b"),
+			(datetime(2025, 1, 3, 9, 0), "hist-c-b"),
+		)
+		for cursor in (None, "", "garbage", "not-a-date|hist-4", "|hist-4", "2025-01-03 09:00:00|"):
+			self.assertIsNone(_parse_history_cursor(cursor), cursor)
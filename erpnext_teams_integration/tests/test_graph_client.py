@@ -0,0 +1,169 @@
+# Copyright (c) 2025, Yanky and Contributors
+# See license.txt
+
+from itertools import chain
+from unittest.mock import patch
+
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_teams_integration.api.graph_client import BATCH_MAX_REQUESTS, GraphClient
+
+
+class FakeResponse:
+	def __init__(self, status_code=200, payload=None, headers=None):
+		self.status_code = status_code
+		self.payload = payload or {}
+		self.headers = headers or {}
+
+	def json(self):
+		return self.payload
+
+
+def batch_reply(statuses, headers=None):
+	"""$batch envelope answering each posted sub-request with statuses[id]"""
+
+	def reply(path, json=None, **kwargs):
+		return FakeResponse(
+			payload={
+				"responses": [
+					{
+						"id": item["id"],
+						"status": statuses[item["id"]],
+						"body": {"id": item["id"]},
+						"headers": (headers or {}).get(item["id"], {}),
+					}
+					for item in json["requests"]
+				]
+			}
+		)
+
+	return reply
+
+
+def in_turn(*replies):
+	"""side_effect answering successive posts with successive replies"""
+	replies = iter(replies)
+
+	def reply(*args, **kwargs):
+		return next(replies)(*args, **kwargs)
+
+	return reply
+
+
+def posted_ids(post):
+	return [[item["id"] for item in call.kwargs["json"]["requests"]] for call in post.call_args_list]
+
+
+class TestGraphClientBatch(FrappeTestCase):
+	def setUp(self):
+		self.client = GraphClient(token="test-token")
+		sleep = patch("erpnext_teams_integration.api.graph_client.time.sleep")
+		self.sleep = sleep.start()
+		self.addCleanup(sleep.stop)
+
+	def requests(self, count):
+		return [{"id": str(i), "method": "GET", "url": f"users/{i}"} for i in range(count)]
+
+	def test_chunks_at_twenty_requests(self):
+		statuses = {str(i): 200 for i in range(45)}
+		with patch.object(GraphClient, "post", side_effect=batch_reply(statuses)) as post:
+			results = self.client.batch(self.requests(45))
+
+		chunks = posted_ids(post)
+		self.assertEqual([len(chunk) for chunk in chunks], [BATCH_MAX_REQUESTS, BATCH_MAX_REQUESTS, 5])
+		self.assertEqual(list(chain.from_iterable(chunks)), [str(i) for i in range(45)])
+		self.assertEqual(len(results), 45)
+		self.assertTrue(all(result["status"] == 200 for result in results.values()))
+		self.sleep.assert_not_called()
+
+	def test_sub_request_urls_are_rooted(self):
+		with patch.object(GraphClient, "post", side_effect=batch_reply({"0": 200})) as post:
+			self.client.batch([{"id": 0, "method": "post", "url": "chats/1/members", "body": {"a": 1}}])
+
+		item = post.call_args.kwargs["json"]["requests"][0]
+		self.assertEqual(item["url"], "/chats/1/members")
+		self.assertEqual(item["method"], "POST")
+		self.assertEqual(item["headers"], {"Content-Type": "application/json"})
+
+	def test_retries_only_throttled_and_server_errors(self):
+		first = batch_reply(
+			{"0": 200, "1": 429, "2": 503, "3": 404, "4": 400},
+			headers={"1": {"Retry-After": "7"}},
+		)
+		second = batch_reply({"1": 200, "2": 200})
+		with patch.object(GraphClient, "post", side_effect=in_turn(first, second)) as post:
+			results = self.client.batch(self.requests(5))
+
+		self.assertEqual(posted_ids(post), [["0", "1", "2", "3", "4"], ["1", "2"]])
+		self.assertEqual(
+			{req_id: result["status"] for req_id, result in results.items()},
+			{"0": 200, "1": 200, "2": 200, "3": 404, "4": 400},
+		)
+		# Retry-After from the throttled item sets the pause
+		self.sleep.assert_called_once_with(7)
+
+	def test_gives_up_after_max_attempts(self):
+		with patch.object(GraphClient, "post", side_effect=batch_reply({"0": 200, "1": 429})) as post:
+			results = self.client.batch(self.requests(2), max_attempts=3)
+
+		self.assertEqual(posted_ids(post), [["0", "1"], ["1"], ["1"]])
+		self.assertEqual(results["1"]["status"], 429)
+		self.assertEqual(self.sleep.call_count, 2)
+
+	def test_failed_envelope_is_shared_by_its_items(self):
+		envelope = FakeResponse(status_code=400, payload={"error": {"code": "BadRequest"}})
+		with patch.object(GraphClient, "post", return_value=envelope) as post:
+			results = self.client.batch(self.requests(3))
+
+		self.assertEqual(post.call_count, 1)
+		for result in results.values():
+			self.assertEqual(result["status"], 400)
+			self.assertEqual(result["body"], {"error": {"code": "BadRequest"}})
+		self.sleep.assert_not_called()
+
+	def test_failed_envelope_is_retried_when_throttled(self):
+		throttled = FakeResponse(status_code=503, headers={"Retry-After": "3"})
+		replies = in_turn(lambda *args, **kwargs: throttled, batch_reply({"0": 201, "1": 201}))
+		with patch.object(GraphClient, "post", side_effect=replies) as post:
+			results = self.client.batch(self.requests(2))
+
+		self.assertEqual(posted_ids(post), [["0", "1"], ["0", "1"]])
+		self.assertEqual({result["status"] for result in results.values()}, {201})
+		self.sleep.assert_called_once_with(3)
+
+	def post_requests(self, count):
+		return [
+			{"id": str(i), "method": "POST", "url": "me/onlineMeetings", "body": {}} for i in range(count)
+		]
+
+	def test_post_is_not_retried_on_server_error(self):
+		# Graph may already have created the meeting behind a 503
+		with patch.object(GraphClient, "post", side_effect=batch_reply({"0": 201, "1": 503})) as post:
+			results = self.client.batch(self.post_requests(2))
+
+		self.assertEqual(posted_ids(post), [["0", "1"]])
+		self.assertEqual(results["1"]["status"], 503)
+		self.sleep.assert_not_called()
+
+	def test_post_is_retried_when_throttled(self):
+		first = batch_reply({"0": 201, "1": 429})
+		second = batch_reply({"1": 201})
+		with patch.object(GraphClient, "post", side_effect=in_turn(first, second)) as post:
+			results = self.client.batch(self.post_requests(2))
+
+		self.assertEqual(posted_ids(post), [["0", "1"], ["1"]])
+		self.assertEqual(results["1"]["status"], 201)
+
+	def test_failed_envelope_retries_only_idempotent_items(self):
+		items = [
+			{"id": "get", "method": "GET", "url": "me"},
+			{"id": "post", "method": "POST", "url": "me/events", "body": {}},
+		]
+		failed = FakeResponse(status_code=502)
+		replies = in_turn(lambda *args, **kwargs: failed, batch_reply({"get": 200}))
+		with patch.object(GraphClient, "post", side_effect=replies) as post:
+			results = self.client.batch(items)
+
+		self.assertEqual(posted_ids(post), [["get", "post"], ["get"]])
+		self.assertEqual(results["post"]["status"], 502)
+		self.assertEqual(results["get"]["status"], 200)
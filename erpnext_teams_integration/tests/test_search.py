@@ -0,0 +1,55 @@
+# Copyright (c) 2025, Yanky and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from erpnext_teams_integration.api.search import boolean_query, search_messages
+
+CHAT_ID = "19:test-search@thread.v2"
+
+
+class TestBooleanQuery(FrappeTestCase):
+	def test_keeps_valid_syntax(self):
+		self.assertEqual(boolean_query("+apple -banana"), "+apple -banana")
+		self.assertEqual(boolean_query('"exact phrase" invoice*'), '"exact phrase" invoice*')
+		self.assertEqual(boolean_query('+"a b" -"c"'), '+"a b" -"c"')
+
+	def test_email_becomes_a_phrase(self):
+		self.assertEqual(boolean_query("john.doe@example.com"), '"john doe example com"')
+
+	def test_drops_stray_operators(self):
+		for query in ("-", "+*", "***", "-@", "()", "  "):
+			self.assertEqual(boolean_query(query), "", query)
+		self.assertEqual(boolean_query(">>word*"), ">word*")
+		self.assertEqual(boolean_query("foo (bar)"), "foo bar")
+
+	def test_closes_unbalanced_quote(self):
+		self.assertEqual(boolean_query('"unbalanced phrase'), '"unbalanced phrase"')
+
+
+class TestSearchMessages(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		frappe.db.delete("Teams Chat Message", {"chat_id": CHAT_ID})
+		frappe.get_doc(
+			{
+				"doctype": "Teams Chat Message",
+				"chat_id": CHAT_ID,
+				"message_id": "msg-search-1",
+				"body": "<p>Please mail john.doe@example.com about the invoice</p>",
+				"body_text": "Please mail john.doe@example.com about the invoice",
+				"created_at": "2025-01-01 09:00:00",
+				"direction": "Inbound",
+			}
+		).insert(ignore_permissions=True)
+
+	def test_operator_only_input_returns_nothing(self):
+		for query in ("-", "+*", "@"):
+			self.assertEqual(search_messages(query, chat_id=CHAT_ID)["results"], [], query)
+
+	def test_email_address_does_not_raise(self):
+		# `@` is the proximity operator and used to end in a 1064 syntax error
+		result = search_messages("john.doe@example.com", chat_id=CHAT_ID)
+		self.assertIsInstance(result["results"], list)